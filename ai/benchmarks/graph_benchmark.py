@@ -0,0 +1,383 @@
+"""
+Benchmarks the LangGraph workflow without calling any provider.
+
+The real graph is built by `build_graph`, but chat models are replaced by a
+fake model streaming a scripted answer with a fixed per-token latency, the
+retriever by a fake one and web search by a local stand-in. Everything not
+spent in the fake model or retriever is the workflow's own overhead.
+
+Run it from the `ai` directory:
+
+    python benchmarks/graph_benchmark.py --concurrency 1 4 16 --output bench.json
+
+Results are written as JSON, compare them between releases to catch
+regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from langchain_core.callbacks import (  # noqa: E402
+    AsyncCallbackManagerForLLMRun,
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForLLMRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.language_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import (  # noqa: E402
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import (  # noqa: E402
+    ChatGeneration,
+    ChatGenerationChunk,
+    ChatResult,
+)
+from langchain_core.retrievers import BaseRetriever  # noqa: E402
+
+from managers.config_manager import Config  # noqa: E402
+from services.graph_service import build_graph  # noqa: E402
+from services.review_policy import ReviewPolicy  # noqa: E402
+from services.workflow_service import SPECULATIVE_TAG  # noqa: E402
+
+QUESTIONS = [
+    "What does the grapple action let me do?",
+    "Should my level 4 wizard take the War Caster feat or raise intelligence?",
+    "I want to create a halfling rogue, roll stats for me",
+    "What is the challenge rating of an adult red dragon?",
+    "How does opportunity attack work when an enemy moves away?",
+]
+
+# Marker of the router prompt, the router is the only agent answering with
+# an intent instead of text.
+ROUTER_MARKER = "Return only one word"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model streaming `tokens` words with `token_latency` seconds between
+    them. When bound to tools it first requests `tool_calls` once per turn,
+    when reviewing it returns the draft unchanged.
+    """
+
+    tokens: int = 120
+    token_latency: float = 0.01
+    tool_calls: list[dict] = []
+    intent: str = "general"
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools_bound": True})
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        system = next((m for m in messages if isinstance(m, SystemMessage)), None)
+        last = messages[-1]
+
+        if system is not None and ROUTER_MARKER in system.content:
+            return AIMessage(content=self.intent)
+        if isinstance(last, AIMessage):
+            # Review, keep the draft so no correction is emitted.
+            return AIMessage(content=last.content)
+
+        turn = []
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            turn.append(message)
+        if self.tools_bound and self.tool_calls and not any(
+            isinstance(message, ToolMessage) for message in turn
+        ):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {**tool_call, "id": f"call_{position}"}
+                    for position, tool_call in enumerate(self.tool_calls)
+                ],
+            )
+        return AIMessage(
+            content=" ".join(f"token{position}" for position in range(self.tokens))
+        )
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> list[AIMessageChunk]:
+        if message.tool_calls:
+            return [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"],
+                            "args": json.dumps(tool_call["args"]),
+                            "id": tool_call["id"],
+                            "index": position,
+                        }
+                        for position, tool_call in enumerate(message.tool_calls)
+                    ],
+                )
+            ]
+        words = message.content.split(" ")
+        return [
+            AIMessageChunk(content=word if position == 0 else f" {word}")
+            for position, word in enumerate(words)
+        ]
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._respond(messages)
+        time.sleep(self.token_latency * len(self._chunks(message)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._chunks(self._respond(messages)):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks(self._respond(messages)):
+            await asyncio.sleep(self.token_latency)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+
+class FakeRetriever(BaseRetriever):
+    """Retriever returning `k` fixed documents after `latency` seconds."""
+
+    k: int = 4
+    latency: float = 0.02
+
+    def _documents(self, query: str) -> list[Document]:
+        return [
+            Document(
+                page_content=f"Rulebook passage {position} about {query}.",
+                metadata={"source": "benchmark", "page": position},
+            )
+            for position in range(self.k)
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        time.sleep(self.latency)
+        return self._documents(query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        await asyncio.sleep(self.latency)
+        return self._documents(query)
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+async def run_request(graph, question: str, answer_nodes: set[str]) -> dict:
+    """Stream one question through the graph and time it from its events."""
+    config = {
+        "configurable": {
+            "provider": "fake",
+            "model": "fake-benchmark",
+            "temperature": 0.0,
+        }
+    }
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    node_starts: dict[str, list[float]] = {}
+    node_latency: dict[str, list[float]] = {}
+    run_starts: dict[str, float] = {}
+    external = 0.0
+
+    async for event in graph.astream_events(
+        {"messages": [HumanMessage(content=question)]}, config, version="v2"
+    ):
+        now = time.perf_counter()
+        event_type = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if event_type in ("on_chat_model_start", "on_retriever_start"):
+            run_starts[event["run_id"]] = now
+        elif event_type in ("on_chat_model_end", "on_retriever_end"):
+            external += now - run_starts.pop(event["run_id"], now)
+
+        if event_type == "on_chain_start" and node and event["name"] == node:
+            node_starts.setdefault(node, []).append(now)
+        elif event_type == "on_chain_end" and node and event["name"] == node:
+            if node_starts.get(node):
+                node_latency.setdefault(node, []).append(now - node_starts[node].pop())
+        elif (
+            event_type == "on_chat_model_stream"
+            and node in answer_nodes
+            and SPECULATIVE_TAG not in event.get("tags", [])
+            and event["data"]["chunk"].content
+        ):
+            tokens += 1
+            if first_token is None:
+                first_token = now - started
+
+    total = time.perf_counter() - started
+    return {
+        "ttft": first_token,
+        "total": total,
+        "tokens": tokens,
+        "overhead": total - external,
+        "node_latency": node_latency,
+    }
+
+
+async def run_level(graph, concurrency: int, requests: int, answer_nodes: set[str]) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(position: int) -> dict:
+        async with semaphore:
+            return await run_request(
+                graph, QUESTIONS[position % len(QUESTIONS)], answer_nodes
+            )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded(position) for position in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    node_latency: dict[str, list[float]] = {}
+    for result in results:
+        for node, latencies in result["node_latency"].items():
+            node_latency.setdefault(node, []).extend(latencies)
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed": elapsed,
+        "requests_per_second": requests / elapsed,
+        "tokens_streamed": sum(result["tokens"] for result in results),
+        "ttft": _summary([r["ttft"] for r in results if r["ttft"] is not None]),
+        "latency": _summary([result["total"] for result in results]),
+        "overhead": _summary([result["overhead"] for result in results]),
+        "node_latency": {
+            node: _summary(latencies) for node, latencies in sorted(node_latency.items())
+        },
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    config = Config()
+    answer_nodes = set(config.get_value("streaming")["answer_nodes"])
+    tool_calls = [
+        {"name": "retrieve_dnd", "args": {"query": "benchmark rules lookup"}}
+        for _ in range(args.tool_calls)
+    ]
+
+    def chat_model_factory(**kwargs) -> BaseChatModel:
+        return FakeChatModel(
+            tokens=args.tokens,
+            token_latency=args.token_latency_ms / 1000,
+            tool_calls=tool_calls,
+        )
+
+    async def search_fn(query: str):
+        await asyncio.sleep(args.retriever_latency_ms / 1000)
+        return [{"url": "https://example.com", "content": f"Result for {query}"}]
+
+    graph = build_graph(
+        FakeRetriever(k=args.k, latency=args.retriever_latency_ms / 1000),
+        review_policy=ReviewPolicy(config),
+        chat_model_factory=chat_model_factory,
+        search_fn=search_fn,
+    )
+
+    # Warm up agent pool and classifier so the first level is not penalized.
+    await run_request(graph, QUESTIONS[0], answer_nodes)
+
+    levels = []
+    for concurrency in args.concurrency:
+        level = await run_level(
+            graph, concurrency, args.requests or concurrency * 4, answer_nodes
+        )
+        levels.append(level)
+        print(
+            f"concurrency={concurrency} req/s={level['requests_per_second']:.2f} "
+            f"ttft_p50={level['ttft'].get('p50', 0) * 1000:.1f}ms "
+            f"overhead_p50={level['overhead']['p50'] * 1000:.1f}ms",
+            file=sys.stderr,
+        )
+
+    return {
+        "parameters": {
+            "tokens": args.tokens,
+            "token_latency_ms": args.token_latency_ms,
+            "retriever_latency_ms": args.retriever_latency_ms,
+            "tool_calls": args.tool_calls,
+            "k": args.k,
+        },
+        "levels": levels,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument(
+        "--requests", type=int, default=None,
+        help="requests per concurrency level, defaults to 4x the concurrency",
+    )
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--token-latency-ms", type=float, default=10.0)
+    parser.add_argument("--retriever-latency-ms", type=float, default=20.0)
+    parser.add_argument("--tool-calls", type=int, default=1)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--output", type=str, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
@@ -0,0 +1,52 @@
+"""
+Multi-worker deployment of the AI service:
+
+    gunicorn -c gunicorn.conf.py
+
+Run from the `ai` directory. The app is imported once in the master
+(preload_app) and shared by the forked workers, each worker then opens its
+own share of `server.db_max_connections`. The index version and ingestion
+jobs are shared through `server.shared_state_path`, metrics through
+PROMETHEUS_MULTIPROC_DIR; /stats and /startup describe the serving worker.
+The mmap vector store backend runs a single worker.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from managers.config_manager import Config  # noqa: E402
+from services.connection_budget import ConnectionBudget  # noqa: E402
+
+try:
+    workers = ConnectionBudget.workers_from_config(Config())
+except ValueError as err:
+    # Fail once here rather than in every worker's VectorStoreService.
+    raise SystemExit(f"gunicorn.conf.py: {err}")
+# Read by ConnectionBudget to split the connection budget across workers.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+wsgi_app = "app:app"
+pythonpath = "src"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+# Metrics are written to files shared by the workers and aggregated on
+# scrape, left over files of a previous run are removed.
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "dnd-metrics")
+)
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,16 +1,40 @@
+import asyncio
 import logging
-import json
+import os
+import uuid
 from typing import cast
-from fastapi import FastAPI, HTTPException
-from fastapi import UploadFile
-from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
-from langgraph.graph.state import CompiledStateGraph
-from langchain_core.messages import HumanMessage, AIMessage
-from managers.config_manager import Config
-from services.vector_store_service import VectorStoreService
-from services.graph_service import build_graph
-from models.query import Query
+from services.startup_timer import startup_timer
+
+with startup_timer.measure("import:fastapi"):
+    from fastapi import FastAPI, HTTPException
+    from fastapi import UploadFile
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
+    from prometheus_client import CONTENT_TYPE_LATEST
+
+with startup_timer.measure("import:langchain"):
+    from langgraph.graph.state import CompiledStateGraph
+    from langchain_core.messages import HumanMessage, AIMessage
+
+with startup_timer.measure("import:services"):
+    from managers.config_manager import Config
+    from services.vector_store_service import VectorStoreService
+    from services.answer_cache_service import AnswerCacheService
+    from services.ingestion_service import IngestionService
+    from services.checkpointer_service import CheckpointerService
+    from services.review_policy import ReviewPolicy
+    from services.startup_indexer import StartupIndexer
+    from services.stream_service import StreamService, format_event
+    from services.graph_service import build_graph
+    from services.metrics import (
+        generate_metrics,
+        register_engine_pool,
+        sample_engine_pools,
+    )
+    from services.lazy_retriever import LazyRetriever
+    from models.query import Query
+    from models.ingestion_job import IngestionJob
+    from models.indexing_status import IndexingStatus
 
 
 def get_vector_store_service() -> VectorStoreService:
@@ -21,30 +45,138 @@ def get_langgraph() -> CompiledStateGraph:
     return cast(CompiledStateGraph, app.state.graph)
 
 
+def get_answer_cache() -> AnswerCacheService:
+    return cast(AnswerCacheService, app.state.answer_cache)
+
+
+def get_ingestion_service() -> IngestionService:
+    return cast(IngestionService, app.state.ingestion_service)
+
+
+def get_review_policy() -> ReviewPolicy:
+    return cast(ReviewPolicy, app.state.review_policy)
+
+
+def get_stream_service() -> StreamService:
+    return cast(StreamService, app.state.stream_service)
+
+
+def get_startup_indexer() -> StartupIndexer:
+    return cast(StartupIndexer, app.state.startup_indexer)
+
+
 config = Config()
 logger = logging.getLogger("uvicorn.error")
 logger.setLevel(logging.DEBUG)
 
+# Read-only assets are loaded at import time, with gunicorn's preload_app
+# once in the master and shared copy-on-write by the forked workers. The
+# graph template gets its retriever and checkpointer per worker, since
+# database connections must not cross a fork.
+with startup_timer.measure("init:graph_template"):
+    review_policy = ReviewPolicy(config=config)
+    graph_retriever = LazyRetriever()
+    graph_template = build_graph(graph_retriever, review_policy=review_policy)
+
+
+async def run_in_background(name: str, coroutine):
+    try:
+        with startup_timer.measure(f"background:{name}"):
+            await coroutine
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        logger.error(f"Background startup step {name} failed: {err}")
+
+
+async def sample_pools_periodically(interval: float = 5.0):
+    while True:
+        sample_engine_pools()
+        await asyncio.sleep(interval)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up")
-    app.state.vector_store_service = await VectorStoreService.create(
-        config=config, to_reembed=False
+    with startup_timer.measure("init:vector_store"):
+        app.state.vector_store_service = await VectorStoreService.create(
+            config=config
+        )
+        register_engine_pool(get_vector_store_service().engine, "vector_store")
+    with startup_timer.measure("init:answer_cache"):
+        app.state.answer_cache = AnswerCacheService(
+            config=config,
+            embeddings=get_vector_store_service().embeddings,
+            index_version=get_vector_store_service().shared_state.index_version,
+        )
+        get_vector_store_service().add_index_listener(get_answer_cache().invalidate)
+    with startup_timer.measure("init:ingestion"):
+        app.state.ingestion_service = IngestionService(
+            config=config, vector_store_service=get_vector_store_service()
+        )
+    with startup_timer.measure("init:checkpointer"):
+        app.state.checkpointer_service = CheckpointerService(config=config)
+        checkpointer = await app.state.checkpointer_service.acreate()
+    with startup_timer.measure("init:graph"):
+        app.state.review_policy = review_policy
+        app.state.stream_service = StreamService(
+            config=config, review_policy=get_review_policy()
+        )
+        # Built on the first question, along with the vector store and the
+        # embedding client it needs.
+        graph_retriever.factory = get_vector_store_service().as_retriever
+        app.state.graph = graph_template.copy(update={"checkpointer": checkpointer})
+    if config.get_value("startup")["draw_mermaid"]:
+        with startup_timer.measure("init:mermaid"):
+            logger.info(get_langgraph().get_graph().draw_mermaid())
+
+    # Serve from the existing index while search indexes are built and new
+    # or changed PDFs are indexed, by a single worker.
+    app.state.startup_indexer = StartupIndexer(
+        config=config, vector_store_service=get_vector_store_service()
     )
-    app.state.graph = build_graph(get_vector_store_service().as_retriever())
-    logger.info(get_langgraph().get_graph().draw_mermaid())
+    get_startup_indexer().start()
+    app.state.background_tasks = set()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # A scrape is served by one worker, the others publish their pool
+        # state on their own.
+        app.state.background_tasks.add(asyncio.create_task(sample_pools_periodically()))
+    if get_startup_indexer().is_leader:
+        app.state.background_tasks.add(
+            asyncio.create_task(
+                run_in_background(
+                    "search_indexes",
+                    get_vector_store_service().acreate_search_indexes(),
+                )
+            )
+        )
+    startup_timer.mark_ready()
     yield
     logger.info("Shutting down")
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+    await get_startup_indexer().aclose()
+    await get_ingestion_service().aclose()
+    await get_vector_store_service().aclose()
+    await app.state.checkpointer_service.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+    "Access-Control-Expose-Headers": "X-Thread-Id",
+}
 
-@app.post("/embed")
+
+@app.post("/embed", status_code=202)
 async def embed(file: UploadFile):
     try:
-        vector_store = get_vector_store_service()
+        ingestion_service = get_ingestion_service()
         match file.content_type:
             case "text/plain":
                 file_type = ".txt"
@@ -53,11 +185,14 @@ async def embed(file: UploadFile):
             case _:
                 logger.error("Not allowed file type")
                 raise HTTPException(status_code=400, detail="Invalid file type")
-        result = await vector_store.save_file_to_vector_store(file, file_type)
+        job = await ingestion_service.submit_upload(file, file_type)
         return {
-            "message": "Vector Store has been updated",
-            "details": result,
+            "message": "File has been queued for the Vector Store",
+            "job_id": job.id,
+            "status_url": f"/embed/{job.id}",
         }
+    except HTTPException:
+        raise
     except Exception as err:
         logger.error(err)
         raise HTTPException(
@@ -66,105 +201,126 @@ async def embed(file: UploadFile):
         )
 
 
+@app.get("/embed/{job_id}")
+async def embed_status(job_id: str) -> IngestionJob:
+    job = get_ingestion_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return job
+
+
+@app.get("/index/status")
+async def index_status() -> IndexingStatus:
+    return get_startup_indexer().status
+
+
+@app.get("/ready")
+async def ready():
+    # Questions are answered from the existing index whatever startup
+    # indexing does, so only an unfinished startup takes the instance out of
+    # rotation. Indexing progress and failures are on /index/status.
+    if getattr(app.state, "startup_indexer", None) is None:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return JSONResponse(status_code=200, content={"ready": True})
+
+
+@app.get("/startup")
+async def startup():
+    return startup_timer.report()
+
+
+@app.get("/stats")
+async def stats():
+    # Hit counters are kept per process, with several workers these are the
+    # serving worker's. Aggregated counts are on /metrics.
+    return {
+        "worker": os.getpid(),
+        "embedding_cache": get_vector_store_service().embeddings.stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "retrieval_cache": get_vector_store_service().retrieval_cache.stats(),
+        "review": get_review_policy().stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/chat")
 async def generate(query: Query):
     graph = get_langgraph()
     input_message = HumanMessage(content=query.question)
     logger.info(f"Input message: {input_message}")
 
+    thread_id = query.thread_id or uuid.uuid4().hex
+    thread_config = {"configurable": {"thread_id": thread_id}}
+    headers = {**SSE_HEADERS, "X-Thread-Id": thread_id}
+    snapshot = await graph.aget_state(thread_config)
+    is_new_thread = not snapshot.values.get("messages")
+
+    # Follow-up answers depend on the thread's history, only the opening
+    # question of a thread is answered from or stored in the cache.
+    answer_cache = get_answer_cache()
+    cache_scope = answer_cache.scope(query.provider, query.model, query.temperature)
+    question_vector = None
+    if is_new_thread:
+        try:
+            question_vector = await answer_cache.aembed(query.question)
+        except Exception as e:
+            logger.error(f"Answer cache embedding error: {str(e)}")
+
+    cached_answer = answer_cache.lookup(question_vector, cache_scope)
+    if cached_answer is not None:
+        logger.info("Answer cache hit")
+        await graph.aupdate_state(
+            thread_config,
+            {"messages": [input_message, AIMessage(content=cached_answer)]},
+            as_node="review",
+        )
+        return StreamingResponse(
+            stream_cached_answer(cached_answer),
+            media_type="text/event-stream",
+            headers=headers,
+        )
+
     # Configure the graph with your settings
     initialised_graph = graph.with_config(
         configurable={
             "provider": query.provider,
             "model": query.model,
             "temperature": query.temperature,
+            "thread_id": thread_id,
         }
     )
 
     async def generate_stream():
-        try:
-            async for event in initialised_graph.astream_events(
-                {"messages": [input_message]},
-                version="v2",
-            ):
-                event_type = event["event"]
-                event_name = event.get("name", "")
-
-                logger.debug(f"Event: {event_type}, Name: {event_name}")
-
-                # Handle LLM model streaming chunks
-                if event_type == "on_chat_model_stream":
-                    chunk = event["data"]["chunk"]
-                    logger.debug(chunk)
-                    # OpenAI-compatible style
-                    if hasattr(chunk, "content") and chunk.content:
-                        payload = json.dumps({"content": chunk.content})
-                        yield f"data: {payload}\n\n"
-                    elif (
-                        hasattr(chunk, "delta")
-                        and hasattr(chunk.delta, "content")
-                        and chunk.delta.content
-                    ):
-                        payload = json.dumps({"content": chunk.delta.content})
-                        yield f"data: {payload}\n\n"
-
-                # Handle LangGraph chain/node streaming
-                elif event_type == "on_chain_stream":
-                    if event_name in [
-                        # "general",
-                        # "advisor",
-                        # # "creator",
-                        # "bestiary",
-                        # "combat",
-                        "review",
-                    ]:
-                        chunk = event["data"].get("chunk")
-                        logger.debug(f"Chunk data: {chunk}")
-
-                        if chunk and "messages" in chunk:
-                            for message in chunk["messages"]:
-                                content = message.content
-                                if content:
-                                    payload = json.dumps({"content": content})
-                                    yield f"data: {payload}\n\n"
-
-                # Handle final output if not streamed
-                elif event_type == "on_chain_end":
-                    if event_name in [
-                        # "general",
-                        # "advisor",
-                        # # "creator",
-                        # "bestiary",
-                        # "combat",
-                        "review",
-                    ]:
-                        output = event["data"].get("output")
-                        if output and hasattr(output, "content") and output.content:
-                            for line in output.content.splitlines():
-                                if line.strip():
-                                    payload = json.dumps({"content": line + "\n"})
-                                    yield f"data: {payload}\n\n"
-
-            # Signal end of stream
-            yield f"data: {json.dumps({'done': True})}\n\n"
-
-        except Exception as e:
-            logger.error(f"Stream error: {str(e)}")
-            error_payload = json.dumps({"error": str(e)})
-            yield f"data: {error_payload}\n\n"
+        events = initialised_graph.astream_events(
+            {"messages": [input_message]},
+            version="v2",
+        )
+        async for sse_event in get_stream_service().astream(
+            events,
+            on_answer=lambda answer: answer_cache.store(
+                question_vector, cache_scope, query.question, answer
+            ),
+        ):
+            yield sse_event
 
     return StreamingResponse(
         generate_stream(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        headers=headers,
     )
 
 
+async def stream_cached_answer(answer: str):
+    yield format_event("node_start", node="cache")
+    for line in answer.splitlines(keepends=True):
+        yield format_event("token", node="cache", content=line)
+    yield format_event("done")
+
+
 # @app.post("/chat")
 # async def generate(query: Query):
 #     graph = get_langgraph()
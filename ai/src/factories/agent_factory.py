@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
+
+from managers.config_manager import Config
+from managers.prompt_manager import PromptManager
+
+
+class AgentFactory:
+    """
+    Bounded LRU pool of ready-to-use `prompt | llm` runnables.
+
+    Agents are keyed by (provider, model, temperature, agent_type, uses_tools),
+    so the chat model client and its HTTP connections are built once and
+    reused across nodes and requests. `chat_model_factory` replaces
+    `init_chat_model`, e.g. with a fake model in benchmarks.
+    """
+
+    def __init__(
+        self,
+        tools,
+        config: Config,
+        prompt_manager: PromptManager,
+        chat_model_factory: Optional[Callable[..., BaseChatModel]] = None,
+    ):
+        self.tools = tools
+        self.config = config
+        self.prompt_manager = prompt_manager
+        self.chat_model_factory = chat_model_factory
+        self.max_size = config.get_value("agent_pool")["max_size"]
+
+        self._agents: OrderedDict[tuple, Runnable] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_agent(
+        self,
+        provider: str,
+        model: str,
+        temperature: float,
+        agent_type: str,
+        uses_tools=False,
+    ) -> Runnable:
+        key = (provider, model, temperature, agent_type, uses_tools)
+
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                self._agents.move_to_end(key)
+                self.hits += 1
+                return agent
+            self.misses += 1
+
+        # Built outside the lock, a concurrent miss for the same key only
+        # costs a duplicate client, the last one stored wins.
+        agent = self._build_agent(provider, model, temperature, agent_type, uses_tools)
+
+        with self._lock:
+            self._agents[key] = agent
+            self._agents.move_to_end(key)
+            while len(self._agents) > self.max_size:
+                self._agents.popitem(last=False)
+                self.evictions += 1
+        return agent
+
+    def _build_agent(
+        self,
+        provider: str,
+        model: str,
+        temperature: float,
+        agent_type: str,
+        uses_tools: bool,
+    ) -> Runnable:
+        key = None
+        if provider == "openai":
+            key = self.config.openai_key
+        elif provider == "google_genai":
+            key = self.config.google_genai_key
+
+        chat_model_factory = self.chat_model_factory
+        if chat_model_factory is None:
+            # Imported on the first agent, it pulls in the provider SDKs.
+            from langchain.chat_models import init_chat_model
+
+            chat_model_factory = init_chat_model
+
+        llm = chat_model_factory(
+            model_provider=provider, model=model, temperature=temperature, api_key=key
+        )
+        system_message = self.prompt_manager.get_template(agent_type)
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", "{system_message}"),
+                MessagesPlaceholder(variable_name="messages"),
+            ]
+        ).partial(system_message=system_message)
+
+        if uses_tools:
+            return prompt | llm.bind_tools(self.tools)
+        return prompt | llm
+
+    def clear(self):
+        with self._lock:
+            self._agents.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._agents),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,21 +1,76 @@
-from langchain.tools.retriever import create_retriever_tool
-from langchain.tools.tavily_search import TavilySearchResults
+from typing import Optional
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.tools import create_retriever_tool
+
+from managers.config_manager import Config
+from services.web_search_cache import (
+    SearchFunction,
+    WebSearchCache,
+    create_cached_search_tool,
+)
+
+
+def create_tavily_search(max_results: int) -> SearchFunction:
+    """
+    Tavily search creating its client on the first query, so the graph can
+    be built without TAVILY_API_KEY, e.g. in tests or with the cache alone.
+    """
+    tavily = None
+
+    async def search_fn(query: str):
+        nonlocal tavily
+        if tavily is None:
+            from langchain_community.tools.tavily_search import TavilySearchResults
+
+            tavily = TavilySearchResults(max_results=max_results)
+        return await tavily.ainvoke({"query": query})
+
+    return search_fn
 
 
 class ToolFactory:
-    def __init__(self, retriever: BaseRetriever):
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        config: Config,
+        search_fn: Optional[SearchFunction] = None,
+    ):
         self.retriever = retriever
+        self.config = config
+        self.search_fn = search_fn
 
     def create_vector_retriever_tool(self):
         return create_retriever_tool(
             retriever=self.retriever,
             name="retrieve_dnd",
-            description="Search and return information from the D&D 5e Player's Handbook."
+            description=(
+                "Search and return information from the D&D 5e Player's Handbook."
+            ),
         )
 
     def create_tavily_tool(self):
-        return TavilySearchResults(max_results=5)
+        web_search = self.config.get_value("web_search")
+        self.web_search_cache = WebSearchCache(
+            path=web_search["cache_path"],
+            ttl_seconds=web_search["ttl_seconds"],
+            max_entries=web_search["max_entries"],
+        )
+
+        search_fn = self.search_fn
+        if search_fn is None and not web_search["offline"]:
+            search_fn = create_tavily_search(web_search["max_results"])
+
+        return create_cached_search_tool(
+            search_fn=search_fn,
+            cache=self.web_search_cache,
+            name="tavily_search_results_json",
+            description=(
+                "A search engine optimized for comprehensive, accurate, and trusted "
+                "results. Useful for when you need to answer questions about current "
+                "events. Input should be a search query."
+            ),
+            offline=web_search["offline"],
+        )
 
     def create_tools(self):
-        return [self.create_vector_retriever_tool(), self.create_tavily_tool()]
\ No newline at end of file
+        return [self.create_vector_retriever_tool(), self.create_tavily_tool()]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class IndexingStatus(BaseModel):
+    status: str = "pending"  # pending | running | ready | failed
+    files_total: int = 0
+    files_changed: int = 0
+    files_indexed: int = 0
+    files_removed: int = 0
+    # File name -> last error of files skipped after `max_attempts`.
+    files_failed: dict[str, str] = Field(default_factory=dict)
+    current_file: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class IngestionJob(BaseModel):
+    id: str
+    filename: str
+    status: str = "queued"  # queued | running | completed | failed
+    pages_parsed: int = 0
+    chunks_total: int = 0
+    chunks_processed: int = 0
+    chunks_embedded: int = 0
+    chunks_skipped: int = 0
+    batches_total: int = 0
+    batches_embedded: int = 0
+    embeddings_per_second: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -6,6 +7,7 @@ class Query(BaseModel):
     provider: str
     model: str
     temperature: float
+    thread_id: Optional[str] = None
 
     class Config:
         extra = "allow"
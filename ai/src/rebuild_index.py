@@ -0,0 +1,28 @@
+"""
+Rebuilds the ANN index of the vector store without blocking reads or writes.
+
+An untyped embedding column, from before `embedding_length` was configured,
+is typed first; that step does lock the table while it is rewritten. Run it
+from the `ai` directory after large ingests or upgrades:
+
+    python src/rebuild_index.py
+"""
+
+import asyncio
+import logging
+from managers.config_manager import Config
+from services.vector_store_service import VectorStoreService
+
+
+async def main():
+    vector_store_service = VectorStoreService(config=Config())
+    try:
+        await vector_store_service.ann_index.arebuild()
+        await vector_store_service.ann_index.aprewarm()
+    finally:
+        await vector_store_service.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
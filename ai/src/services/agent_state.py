@@ -3,4 +3,6 @@ from langgraph.graph.message import add_messages
 
 class AgentState(TypedDict):
   messages: Annotated[list, add_messages]
-  intent: str
\ No newline at end of file
+  intent: str
+  review_changed: bool
+  tool_cache: dict
\ No newline at end of file
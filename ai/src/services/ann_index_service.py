@@ -0,0 +1,164 @@
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("uvicorn.error")
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+
+
+class AnnIndexService:
+    """
+    Creates, prewarms and rebuilds the pgvector ANN index on the embeddings
+    table, and applies the runtime search settings to every pooled connection.
+    """
+
+    def __init__(self, engine: AsyncEngine, ann_config: dict, embedding_length: int):
+        self.engine = engine
+        self.enabled = ann_config["enabled"]
+        self.method = ann_config["method"]
+        self.m = int(ann_config["m"])
+        self.ef_construction = int(ann_config["ef_construction"])
+        self.lists = int(ann_config["lists"])
+        self.ef_search = int(ann_config["ef_search"])
+        self.probes = int(ann_config["probes"])
+        self.prewarm = ann_config["prewarm"]
+        self.embedding_length = int(embedding_length)
+
+        if self.method not in ("hnsw", "ivfflat"):
+            raise ValueError(f"Unsupported ANN index method: {self.method}")
+        self.index_name = f"ix_{EMBEDDING_TABLE}_{self.method}"
+
+        if self.enabled:
+            event.listen(self.engine.sync_engine, "connect", self._configure_session)
+
+    @property
+    def search_setting(self) -> tuple[str, int]:
+        if self.method == "hnsw":
+            return "hnsw.ef_search", self.ef_search
+        return "ivfflat.probes", self.probes
+
+    def _configure_session(self, dbapi_connection, connection_record):
+        # Outside autocommit the SET would belong to the connection's first
+        # transaction and be rolled back with it when the pool resets it.
+        name, value = self.search_setting
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET {name} = {value}")
+            cursor.close()
+        finally:
+            dbapi_connection.autocommit = autocommit
+
+    async def acheck_session(self) -> bool:
+        """Read the search setting back on a pooled connection."""
+        if not self.enabled:
+            return True
+        name, value = self.search_setting
+        async with self.engine.connect() as connection:
+            current = await connection.scalar(text(f"SHOW {name}"))
+        if str(current) != str(value):
+            logger.warning(f"{name} is {current} on pooled connections, expected {value}")
+            return False
+        return True
+
+    def _index_definition(self) -> str:
+        if self.method == "hnsw":
+            options = f"m = {self.m}, ef_construction = {self.ef_construction}"
+        else:
+            options = f"lists = {self.lists}"
+        return (
+            f"ON {EMBEDDING_TABLE} USING {self.method} "
+            f"(embedding vector_cosine_ops) WITH ({options})"
+        )
+
+    async def _column_type(self) -> str:
+        async with self.engine.connect() as connection:
+            return await connection.scalar(
+                text(
+                    "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                    "WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'"
+                ),
+                {"table": EMBEDDING_TABLE},
+            )
+
+    async def acheck_dimensions(self) -> bool:
+        """
+        ANN indexes need a fixed dimension, tables created before
+        `embedding_length` was configured hold an untyped vector column.
+        Only checked here, see `afix_dimensions`.
+        """
+        expected = f"vector({self.embedding_length})"
+        column_type = await self._column_type()
+        if column_type != expected:
+            logger.warning(
+                f"{EMBEDDING_TABLE}.embedding is {column_type}, expected {expected}; "
+                "run src/rebuild_index.py to fix it before the ANN index is built"
+            )
+            return False
+        return True
+
+    async def afix_dimensions(self):
+        """
+        Type an untyped embedding column. Rewrites the table under an ACCESS
+        EXCLUSIVE lock, so it only runs from rebuild_index.py.
+        """
+        expected = f"vector({self.embedding_length})"
+        column_type = await self._column_type()
+        if column_type == expected:
+            return
+        if column_type != "vector":
+            raise ValueError(
+                f"{EMBEDDING_TABLE}.embedding is {column_type}, the configured "
+                f"embedding_length needs {expected}; re-embed into a new collection"
+            )
+        logger.info(f"Fixing {EMBEDDING_TABLE}.embedding to {expected}")
+        async with self.engine.begin() as connection:
+            await connection.execute(
+                text(
+                    f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding "
+                    f"TYPE {expected}"
+                )
+            )
+
+    async def _execute_autocommit(self, statement: str):
+        # CONCURRENTLY cannot run inside a transaction block.
+        async with self.engine.connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            await connection.execute(text(statement))
+
+    async def acreate(self):
+        if not self.enabled:
+            return
+        if not await self.acheck_dimensions():
+            return
+        await self._execute_autocommit(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.index_name} "
+            f"{self._index_definition()}"
+        )
+        await self.acheck_session()
+
+    async def aprewarm(self):
+        if not (self.enabled and self.prewarm):
+            return
+        try:
+            async with self.engine.begin() as connection:
+                await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_prewarm"))
+                blocks = await connection.scalar(
+                    text("SELECT pg_prewarm(CAST(:index AS regclass))"),
+                    {"index": self.index_name},
+                )
+            logger.info(f"Prewarmed {self.index_name} ({blocks} blocks)")
+        except Exception as err:
+            logger.warning(f"Could not prewarm {self.index_name}: {err}")
+
+    async def arebuild(self):
+        if not self.enabled:
+            return
+        logger.info(f"Rebuilding {self.index_name} concurrently")
+        await self.afix_dimensions()
+        await self.acreate()
+        await self._execute_autocommit(f"REINDEX INDEX CONCURRENTLY {self.index_name}")
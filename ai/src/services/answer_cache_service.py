@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from managers.config_manager import Config
+
+
+class AnswerCacheService:
+    """
+    Semantic cache of final answers keyed by the embedding of the question.
+
+    Entries are scoped by (provider, model, temperature), expire after a TTL,
+    are evicted LRU past `max_entries` and persisted in a local SQLite file.
+    When `index_version` changes, e.g. after another worker indexed new
+    documents, the entries are reloaded from the file that worker cleared.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        embeddings: Embeddings,
+        index_version: Optional[Callable[[], int]] = None,
+    ):
+        cache_config = config.get_value("answer_cache")
+        self.enabled = cache_config["enabled"]
+        self.similarity_threshold = cache_config["similarity_threshold"]
+        self.ttl_seconds = cache_config["ttl_seconds"]
+        self.max_entries = cache_config["max_entries"]
+        self.path = cache_config["path"]
+        self.embeddings = embeddings
+        self.index_version = index_version
+        self._seen_version = index_version() if index_version else None
+
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._scope_index: dict[str, tuple[list[str], np.ndarray]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled:
+            self._connection = self._connect()
+            self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        connection.commit()
+        return connection
+
+    def _load(self):
+        expired_before = time.time() - self.ttl_seconds
+        self._connection.execute(
+            "DELETE FROM answers WHERE created_at < ?", (expired_before,)
+        )
+        self._connection.commit()
+        rows = self._connection.execute(
+            "SELECT id, scope, question, answer, vector, created_at FROM answers "
+            "ORDER BY accessed_at"
+        )
+        for entry_id, scope, question, answer, vector, created_at in rows:
+            self._entries[entry_id] = {
+                "scope": scope,
+                "question": question,
+                "answer": answer,
+                "vector": np.frombuffer(vector, dtype=np.float32),
+                "created_at": created_at,
+            }
+
+    @staticmethod
+    def scope(provider: str, model: str, temperature: float) -> str:
+        return f"{provider}:{model}:{float(temperature)}"
+
+    async def aembed(self, question: str) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        vector = np.asarray(
+            await self.embeddings.aembed_query(question.strip().lower()),
+            dtype=np.float32,
+        )
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: Optional[np.ndarray], scope: str) -> Optional[str]:
+        if vector is None:
+            return None
+
+        with self._lock:
+            self._sync_index_version()
+            ids, matrix = self._get_scope_index(scope)
+            if not ids:
+                self.misses += 1
+                return None
+
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            entry_id = ids[best]
+            entry = self._entries[entry_id]
+
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                self._remove(entry_id)
+                self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+        self._connection.execute(
+            "UPDATE answers SET accessed_at = ? WHERE id = ?", (time.time(), entry_id)
+        )
+        self._connection.commit()
+        return entry["answer"]
+
+    def store(
+        self, vector: Optional[np.ndarray], scope: str, question: str, answer: str
+    ):
+        if vector is None or not answer.strip():
+            return
+
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._entries[entry_id] = {
+                "scope": scope,
+                "question": question,
+                "answer": answer,
+                "vector": vector,
+                "created_at": now,
+            }
+            self._scope_index.pop(scope, None)
+            self._connection.execute(
+                "INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry_id, scope, question, answer, vector.tobytes(), now, now),
+            )
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._connection.commit()
+
+    def invalidate(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.clear()
+            self._scope_index.clear()
+            self._connection.execute("DELETE FROM answers")
+            self._connection.commit()
+            if self.index_version is not None:
+                self._seen_version = self.index_version()
+
+    def _sync_index_version(self):
+        if self.index_version is None:
+            return
+        version = self.index_version()
+        if version != self._seen_version:
+            self._seen_version = version
+            self._entries.clear()
+            self._scope_index.clear()
+            self._load()
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id)
+        self._scope_index.pop(entry["scope"], None)
+        self._connection.execute("DELETE FROM answers WHERE id = ?", (entry_id,))
+
+    def _get_scope_index(self, scope: str) -> tuple[list[str], np.ndarray]:
+        if scope not in self._scope_index:
+            ids = [
+                entry_id
+                for entry_id, entry in self._entries.items()
+                if entry["scope"] == scope
+            ]
+            matrix = (
+                np.vstack([self._entries[entry_id]["vector"] for entry_id in ids])
+                if ids
+                else np.empty((0, 0), dtype=np.float32)
+            )
+            self._scope_index[scope] = (ids, matrix)
+        return self._scope_index[scope]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper caching vectors by (model name, content hash).
+
+    Document vectors are persisted in a local SQLite store, query vectors are
+    kept in an in-memory LRU. Misses are de-duplicated and sent to the
+    underlying embeddings in batches of `batch_size`. Given
+    `underlying_factory` instead, the underlying embeddings are only created
+    on the first miss.
+    """
+
+    def __init__(
+        self,
+        underlying: Optional[Embeddings],
+        model_name: str,
+        path: str,
+        batch_size: int = 100,
+        query_cache_size: int = 1024,
+        underlying_factory: Optional[Callable[[], Embeddings]] = None,
+    ):
+        if underlying is None and underlying_factory is None:
+            raise ValueError("Either underlying or underlying_factory is required")
+        self._underlying = underlying
+        self._underlying_factory = underlying_factory
+        self.model_name = model_name
+        self.path = path
+        self.batch_size = batch_size
+        self.query_cache_size = query_cache_size
+
+        self._queries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = Lock()
+        self._connection = self._connect()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def underlying(self) -> Embeddings:
+        if self._underlying is None:
+            with self._lock:
+                if self._underlying is None:
+                    self._underlying = self._underlying_factory()
+        return self._underlying
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        connection.commit()
+        return connection
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def _load(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def _save(self, vectors: dict[str, list[float]]):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in vectors.items()
+                ],
+            )
+            self._connection.commit()
+
+    def _lookup(self, texts: list[str]) -> tuple[list[str], dict, dict[str, str]]:
+        keys = [self._key(text) for text in texts]
+        found = self._load(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in found:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = text
+        return keys, found, missing
+
+    def _batches(self, missing: dict[str, str]):
+        items = list(missing.items())
+        for start in range(0, len(items), self.batch_size):
+            yield items[start : start + self.batch_size]
+
+    def stored(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Persisted vectors of `texts`, None where there is none."""
+        keys = [self._key(text) for text in texts]
+        found = self._load(list(set(keys)))
+        return [found.get(key) for key in keys]
+
+    def missing(self, texts: list[str]) -> dict[str, str]:
+        """Texts without a cached vector, keyed by their cache key."""
+        keys = {self._key(text): text for text in texts}
+        found = self._load(list(keys))
+        return {key: text for key, text in keys.items() if key not in found}
+
+    async def aembed_batch(self, batch: list[tuple[str, str]]):
+        """Embed (key, text) pairs from `missing` and persist their vectors."""
+        vectors = await self.underlying.aembed_documents([text for _, text in batch])
+        self._save({key: vector for (key, _), vector in zip(batch, vectors)})
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._lookup(texts)
+        for batch in self._batches(missing):
+            vectors = self.underlying.embed_documents([text for _, text in batch])
+            computed = {key: vector for (key, _), vector in zip(batch, vectors)}
+            self._save(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._lookup(texts)
+        for batch in self._batches(missing):
+            vectors = await self.underlying.aembed_documents(
+                [text for _, text in batch]
+            )
+            computed = {key: vector for (key, _), vector in zip(batch, vectors)}
+            self._save(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def _get_query(self, key: str):
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return vector
+
+    def _put_query(self, key: str, vector: list[float]):
+        with self._lock:
+            self._queries[key] = vector
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        vector = self._get_query(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._put_query(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        vector = self._get_query(key)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._put_query(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "query_cache_size": len(self._queries),
+        }
@@ -0,0 +1,116 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Optional
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents.base import Document
+from langchain_core.retrievers import BaseRetriever
+
+from services.metrics import RETRIEVAL_CACHE
+
+
+class RetrievalCache:
+    """
+    LRU + TTL cache of retrieval results.
+
+    Every entry remembers the index version it was computed at, entries from
+    an older version of the index are treated as misses and dropped.
+    """
+
+    def __init__(
+        self, index_version: Callable[[], int], max_entries: int, ttl_seconds: float
+    ):
+        self.index_version = index_version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: OrderedDict[str, tuple[int, float, list[Document]]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[list[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, created_at, docs = entry
+                if (
+                    version == self.index_version()
+                    and time.time() - created_at <= self.ttl_seconds
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    RETRIEVAL_CACHE.labels("hit").inc()
+                    return list(docs)
+                del self._entries[key]
+            self.misses += 1
+            RETRIEVAL_CACHE.labels("miss").inc()
+            return None
+
+    def put(self, key: str, docs: list[Document], version: int):
+        with self._lock:
+            self._entries[key] = (version, time.time(), list(docs))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "index_version": self.index_version(),
+        }
+
+
+class CachedRetriever(BaseRetriever):
+    """Retriever serving repeated queries from a `RetrievalCache`."""
+
+    retriever: BaseRetriever
+    cache: RetrievalCache
+
+    def _cache_key(self, query: str) -> str:
+        params = {
+            "search_type": getattr(self.retriever, "search_type", None),
+            "search_kwargs": getattr(self.retriever, "search_kwargs", None),
+        }
+        normalized = " ".join(query.lower().split())
+        return f"{normalized}\0{json.dumps(params, sort_keys=True, default=str)}"
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        key = self._cache_key(query)
+        docs = self.cache.get(key)
+        if docs is None:
+            version = self.cache.index_version()
+            docs = self.retriever.invoke(
+                query, config={"callbacks": run_manager.get_child()}
+            )
+            self.cache.put(key, docs, version)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        key = self._cache_key(query)
+        docs = self.cache.get(key)
+        if docs is None:
+            version = self.cache.index_version()
+            docs = await self.retriever.ainvoke(
+                query, config={"callbacks": run_manager.get_child()}
+            )
+            self.cache.put(key, docs, version)
+        return docs
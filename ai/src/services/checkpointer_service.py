@@ -0,0 +1,84 @@
+import logging
+import os
+from typing import Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from sqlalchemy.engine import make_url
+
+from managers.config_manager import Config
+from services.connection_budget import ConnectionBudget
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class CheckpointerService:
+    """
+    Provides the LangGraph checkpointer holding per-thread conversation state.
+
+    Uses Postgres when configured and reachable, otherwise falls back to an
+    in-memory saver that only lives as long as the process.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.memory_config = config.get_value("memory")
+        self.checkpointer: Optional[BaseCheckpointSaver] = None
+        self._pool = None
+
+    def _conninfo(self) -> Optional[str]:
+        connection = self.config.get_value("vector_store")["conn_str"]
+        if connection == "no_free_database":
+            connection = os.getenv("POSTGRES_TEG")
+        if not connection:
+            return None
+        # psycopg expects a plain libpq url, without the SQLAlchemy driver.
+        return (
+            make_url(connection)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+
+    async def acreate(self) -> BaseCheckpointSaver:
+        if self.memory_config["checkpointer"] == "postgres":
+            try:
+                self.checkpointer = await self._acreate_postgres()
+                return self.checkpointer
+            except Exception as err:
+                logger.warning(
+                    f"Postgres checkpointer unavailable, keeping threads in memory: {err}"
+                )
+        self.checkpointer = InMemorySaver()
+        return self.checkpointer
+
+    async def _acreate_postgres(self) -> BaseCheckpointSaver:
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        conninfo = self._conninfo()
+        if conninfo is None:
+            raise ValueError("no Postgres connection configured")
+
+        # Idle connections count against the budget of every worker, only
+        # keep one open and grow on demand.
+        self._pool = AsyncConnectionPool(
+            conninfo=conninfo,
+            min_size=1,
+            max_size=ConnectionBudget.from_config(self.config).checkpointer_pool_size,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        try:
+            await self._pool.open()
+            checkpointer = AsyncPostgresSaver(self._pool)
+            await checkpointer.setup()
+        except Exception:
+            await self._pool.close()
+            self._pool = None
+            raise
+        return checkpointer
+
+    async def aclose(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -0,0 +1,92 @@
+import os
+from dataclasses import dataclass
+
+from managers.config_manager import Config
+
+
+@dataclass(frozen=True)
+class ConnectionBudget:
+    """
+    Per-worker share of the Postgres connections the service may open.
+
+    `server.db_max_connections` is the total across all workers. The worker
+    count comes from `WEB_CONCURRENCY`, which gunicorn.conf.py sets from
+    `server.workers`; a process started without it (plain uvicorn) is the
+    only worker. Each worker's share is split between the vector store
+    engine (half pooled, half overflow) and the checkpointer pool.
+    """
+
+    workers: int
+    per_worker: int
+    engine_pool_size: int
+    engine_max_overflow: int
+    checkpointer_pool_size: int
+
+    @staticmethod
+    def max_workers(config: Config) -> int:
+        server_config = config.get_value("server")
+        return (
+            server_config["db_max_connections"]
+            // server_config["min_connections_per_worker"]
+        )
+
+    @classmethod
+    def workers_from_config(cls, config: Config) -> int:
+        """
+        Worker count for gunicorn: `server.workers`, or one per CPU capped
+        by the connection budget when it is `auto`. `WEB_CONCURRENCY`
+        overrides the configured value. The mmap vector store lives in the
+        memory of the process that writes it, it always runs one worker.
+        """
+        server_config = config.get_value("server")
+        requested = os.getenv("WEB_CONCURRENCY") or server_config["workers"]
+        if config.get_value("vector_store")["backend"] == "mmap":
+            if str(requested) not in ("auto", "1"):
+                raise ValueError(
+                    f"{requested} workers requested, the mmap vector store "
+                    f"runs a single worker; set server.workers to 1 or use "
+                    f"the pgvector backend"
+                )
+            return 1
+        max_workers = cls.max_workers(config)
+        if max_workers < 1:
+            raise ValueError(
+                f"server.db_max_connections={server_config['db_max_connections']} "
+                f"is below server.min_connections_per_worker="
+                f"{server_config['min_connections_per_worker']}"
+            )
+        if str(requested) == "auto":
+            return min(os.cpu_count() or 1, max_workers)
+        workers = int(requested)
+        if not 1 <= workers <= max_workers:
+            raise ValueError(
+                f"{workers} workers do not fit server.db_max_connections="
+                f"{server_config['db_max_connections']} with "
+                f"{server_config['min_connections_per_worker']} connections per "
+                f"worker, use at most {max_workers} workers or raise the budget"
+            )
+        return workers
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ConnectionBudget":
+        server_config = config.get_value("server")
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY") or 1))
+        per_worker = server_config["db_max_connections"] // workers
+        if per_worker < server_config["min_connections_per_worker"]:
+            raise ValueError(
+                f"db_max_connections={server_config['db_max_connections']} is too "
+                f"small for {workers} workers, each needs at least "
+                f"{server_config['min_connections_per_worker']} connections"
+            )
+
+        checkpointer = max(1, round(per_worker * server_config["checkpointer_share"]))
+        checkpointer = min(checkpointer, per_worker - 1)
+        engine = per_worker - checkpointer
+        engine_pool_size = (engine + 1) // 2
+        return cls(
+            workers=workers,
+            per_worker=per_worker,
+            engine_pool_size=engine_pool_size,
+            engine_max_overflow=engine - engine_pool_size,
+            checkpointer_pool_size=checkpointer,
+        )
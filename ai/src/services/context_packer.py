@@ -0,0 +1,219 @@
+import math
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+# Same heuristic as `count_tokens_approximately`, used for history trimming.
+CHARS_PER_TOKEN = 4.0
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate token count, one token per `CHARS_PER_TOKEN` characters.
+
+    Not the tokenizer of the embedding or chat model, sizes in tokens
+    (`splitter`, `context_packing.max_tokens`) are estimates. English prose
+    usually runs 4 to 5 characters per token, tables and numbers less.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _location(doc: Document) -> tuple:
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _overlap(left: str, right: str, min_chars: int, max_chars: int) -> int:
+    """
+    Length of the longest suffix of `left` that is a prefix of `right`, at
+    most `max_chars`. Linear in `max_chars`, using the prefix function of
+    `right + separator + left` over the search window.
+    """
+    window = min(len(left), len(right), max_chars)
+    if window < min_chars:
+        return 0
+    text = right[:window] + "\0" + left[len(left) - window :]
+    prefix = [0] * len(text)
+    for position in range(1, len(text)):
+        size = prefix[position - 1]
+        while size and text[position] != text[size]:
+            size = prefix[size - 1]
+        if text[position] == text[size]:
+            size += 1
+        prefix[position] = size
+    return prefix[-1] if prefix[-1] >= min_chars else 0
+
+
+class ContextPackingRetriever(BaseRetriever):
+    """
+    Post-retrieval stage shrinking what the `retrieve_dnd` tool returns.
+
+    - chunks contained in another chunk of the same source and page are
+      dropped;
+    - the rest are ordered by maximal marginal relevance, chunks nearly
+      identical to an already selected one are skipped;
+    - selected chunks overlapping on the same page are merged, looking for
+      at most `max_overlap_chars`, the splitter's chunk overlap;
+    - the result is packed into `max_tokens`, counted with `count_tokens`.
+
+    Chunk vectors are read from the embeddings cache filled at indexing,
+    only chunks missing from it are embedded.
+    """
+
+    retriever: BaseRetriever
+    embeddings: Embeddings
+    max_tokens: int = 1500
+    mmr_lambda: float = 0.7
+    duplicate_threshold: float = 0.95
+    min_overlap_chars: int = 20
+    max_overlap_chars: int = 150
+
+    @property
+    def search_type(self):
+        return getattr(self.retriever, "search_type", None)
+
+    @property
+    def search_kwargs(self) -> dict:
+        return {
+            "retriever": getattr(self.retriever, "search_kwargs", None),
+            "max_tokens": self.max_tokens,
+            "mmr_lambda": self.mmr_lambda,
+            "duplicate_threshold": self.duplicate_threshold,
+        }
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        docs = self._drop_contained(
+            self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        )
+        if len(docs) < 2:
+            return self._pack(docs)
+        query_vector = self.embeddings.embed_query(query)
+        vectors, missing = self._stored_vectors(docs)
+        if missing:
+            embedded = self.embeddings.embed_documents(
+                [docs[position].page_content for position in missing]
+            )
+            for position, vector in zip(missing, embedded):
+                vectors[position] = vector
+        return self._pack(self._merge(self._select(docs, query_vector, vectors)))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        docs = self._drop_contained(
+            await self.retriever.ainvoke(
+                query, config={"callbacks": run_manager.get_child()}
+            )
+        )
+        if len(docs) < 2:
+            return self._pack(docs)
+        # A cache hit, the query was just embedded for the search.
+        query_vector = await self.embeddings.aembed_query(query)
+        vectors, missing = self._stored_vectors(docs)
+        if missing:
+            embedded = await self.embeddings.aembed_documents(
+                [docs[position].page_content for position in missing]
+            )
+            for position, vector in zip(missing, embedded):
+                vectors[position] = vector
+        return self._pack(self._merge(self._select(docs, query_vector, vectors)))
+
+    def _stored_vectors(self, docs: list[Document]) -> tuple[list, list[int]]:
+        """Vectors already stored for `docs`, and the positions lacking one."""
+        stored = getattr(self.embeddings, "stored", None)
+        vectors = (
+            stored([doc.page_content for doc in docs])
+            if stored is not None
+            else [None] * len(docs)
+        )
+        return vectors, [
+            position for position, vector in enumerate(vectors) if vector is None
+        ]
+
+    @staticmethod
+    def _drop_contained(docs: list[Document]) -> list[Document]:
+        kept: list[Document] = []
+        for doc in sorted(docs, key=lambda doc: -len(doc.page_content)):
+            if not any(
+                _location(doc) == _location(other)
+                and doc.page_content in other.page_content
+                for other in kept
+            ):
+                kept.append(doc)
+        # Restore the retriever's ranking.
+        kept_ids = {id(doc) for doc in kept}
+        return [doc for doc in docs if id(doc) in kept_ids]
+
+    def _select(
+        self,
+        docs: list[Document],
+        query_vector: list[float],
+        vectors: list[list[float]],
+    ) -> list[Document]:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        order = maximal_marginal_relevance(
+            np.asarray(query_vector, dtype=np.float32),
+            matrix,
+            lambda_mult=self.mmr_lambda,
+            k=len(docs),
+        )
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        normalized = matrix / norms[:, None]
+
+        selected: list[int] = []
+        for position in order:
+            if selected and float(
+                np.max(normalized[selected] @ normalized[position])
+            ) >= self.duplicate_threshold:
+                continue
+            selected.append(position)
+        return [docs[position] for position in selected]
+
+    def _merge(self, docs: list[Document]) -> list[Document]:
+        """Merge chunks of the same page sharing their splitter overlap."""
+        merged: list[Document] = []
+        for doc in docs:
+            for position, other in enumerate(merged):
+                if _location(doc) != _location(other):
+                    continue
+                text = None
+                if size := self._overlap(other.page_content, doc.page_content):
+                    text = other.page_content + doc.page_content[size:]
+                elif size := self._overlap(doc.page_content, other.page_content):
+                    text = doc.page_content + other.page_content[size:]
+                if text is not None:
+                    merged[position] = Document(
+                        page_content=text, metadata=other.metadata
+                    )
+                    break
+            else:
+                merged.append(doc)
+        return merged
+
+    def _overlap(self, left: str, right: str) -> int:
+        return _overlap(left, right, self.min_overlap_chars, self.max_overlap_chars)
+
+    def _pack(self, docs: list[Document]) -> list[Document]:
+        packed: list[Document] = []
+        budget = self.max_tokens
+        for doc in docs:
+            tokens = count_tokens(doc.page_content)
+            if tokens <= budget:
+                packed.append(doc)
+                budget -= tokens
+            elif not packed:
+                # Never return nothing, cut the best chunk to the budget.
+                cut = int(budget * CHARS_PER_TOKEN)
+                packed.append(
+                    Document(page_content=doc.page_content[:cut], metadata=doc.metadata)
+                )
+                break
+        return packed
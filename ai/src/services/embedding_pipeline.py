@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from managers.config_manager import Config
+from services.cached_embeddings import CachedEmbeddings
+from services.metrics import EMBEDDING_RATE_LIMITS
+
+logger = logging.getLogger("uvicorn.error")
+
+RATE_LIMIT_MARKERS = ("429", "resource_exhausted", "rate limit", "quota")
+
+
+def is_rate_limit(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+@dataclass
+class EmbeddingProgress:
+    texts_total: int
+    texts_cached: int
+    batches_total: int
+    batches_done: int = 0
+    rate_limited: int = 0
+    # Batches allowed in flight, halved on rate limits.
+    in_flight_limit: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def texts_per_second(self) -> float:
+        embedded = self.texts_total - self.texts_cached
+        return embedded / self.elapsed if self.elapsed else 0.0
+
+
+class EmbeddingPipeline:
+    """
+    Fills the embedding cache ahead of indexing.
+
+    Texts without a cached vector are sent in `batch_size` batches, at most
+    `max_in_flight` at a time. The limit is halved on every rate-limit error
+    and grows back by one per successful batch; a failed batch is retried
+    with exponential backoff. Every finished batch is persisted, so a retry
+    or a later run only embeds what is still missing, and indexing itself
+    then only reads from the cache.
+    """
+
+    def __init__(self, config: Config, embeddings: CachedEmbeddings):
+        pipeline_config = config.get_value("embedding_pipeline")
+        self.embeddings = embeddings
+        self.batch_size = pipeline_config["batch_size"]
+        self.max_in_flight = pipeline_config["max_in_flight"]
+        self.max_retries = pipeline_config["max_retries"]
+        self.initial_backoff = pipeline_config["initial_backoff_seconds"]
+        self.max_backoff = pipeline_config["max_backoff_seconds"]
+
+    async def aembed(
+        self,
+        texts: list[str],
+        on_progress: Optional[Callable[[EmbeddingProgress], None]] = None,
+    ) -> EmbeddingProgress:
+        missing = list(self.embeddings.missing(texts).items())
+        batches = [
+            missing[start : start + self.batch_size]
+            for start in range(0, len(missing), self.batch_size)
+        ]
+        progress = EmbeddingProgress(
+            texts_total=len(set(texts)),
+            texts_cached=len(set(texts)) - len(missing),
+            batches_total=len(batches),
+            in_flight_limit=self.max_in_flight,
+        )
+        if on_progress is not None:
+            on_progress(progress)
+        if not batches:
+            return progress
+
+        started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue()
+        for batch in batches:
+            queue.put_nowait(batch)
+        state = {"active": 0}
+        slots = asyncio.Condition()
+
+        async def worker():
+            while not queue.empty():
+                batch = queue.get_nowait()
+                async with slots:
+                    await slots.wait_for(
+                        lambda: state["active"] < progress.in_flight_limit
+                    )
+                    state["active"] += 1
+                try:
+                    await self._aembed_batch(batch, progress)
+                finally:
+                    async with slots:
+                        state["active"] -= 1
+                        slots.notify_all()
+                progress.batches_done += 1
+                progress.elapsed = time.perf_counter() - started
+                if on_progress is not None:
+                    on_progress(progress)
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.max_in_flight, len(batches)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        logger.info(
+            f"Embedded {len(missing)} texts in {progress.batches_total} batches, "
+            f"{progress.texts_per_second:.1f} texts/sec, "
+            f"{progress.rate_limited} rate limited"
+        )
+        return progress
+
+    async def _aembed_batch(self, batch, progress: EmbeddingProgress):
+        backoff = self.initial_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.embeddings.aembed_batch(batch)
+                progress.in_flight_limit = min(
+                    self.max_in_flight, progress.in_flight_limit + 1
+                )
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                if is_rate_limit(e):
+                    progress.rate_limited += 1
+                    EMBEDDING_RATE_LIMITS.inc()
+                    progress.in_flight_limit = max(1, progress.in_flight_limit // 2)
+                    logger.warning(
+                        f"Embedding rate limited, "
+                        f"{progress.in_flight_limit} batches in flight"
+                    )
+                else:
+                    logger.warning(f"Embedding batch failed, retrying: {e}")
+                # Full jitter, so throttled batches do not retry in lockstep.
+                await asyncio.sleep(random.uniform(0, backoff))
+                backoff = min(self.max_backoff, backoff * 2)
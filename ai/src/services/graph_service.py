@@ -1,16 +1,29 @@
 from managers.config_manager import Config
 from factories.tool_factory import ToolFactory
+from services.review_policy import ReviewPolicy
+from services.web_search_cache import SearchFunction
 from services.workflow_service import WorkflowService
+from langchain_core.language_models import BaseChatModel
 from langchain_core.retrievers import BaseRetriever
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from typing import Callable, Optional
 
 
-def build_graph(retriever: BaseRetriever):
+def build_graph(
+    retriever: BaseRetriever,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    review_policy: Optional[ReviewPolicy] = None,
+    chat_model_factory: Optional[Callable[..., BaseChatModel]] = None,
+    search_fn: Optional[SearchFunction] = None,
+):
     config_obj = Config()
-    tool_factory = ToolFactory(retriever)
+    tool_factory = ToolFactory(retriever, config_obj, search_fn)
     tools = tool_factory.create_tools()
 
-    workflow = WorkflowService(tools, config_obj).build()
+    workflow = WorkflowService(
+        tools, config_obj, review_policy, chat_model_factory
+    ).build()
 
-    graph = workflow.compile()
+    graph = workflow.compile(checkpointer=checkpointer)
 
     return graph
@@ -0,0 +1,137 @@
+import asyncio
+import re
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents.base import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_postgres.vectorstores import PGVector
+from pydantic import PrivateAttr, field_validator
+from typing import Any, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+FULL_TEXT_INDEX = "ix_langchain_pg_embedding_document_fts"
+
+
+def create_full_text_index_sql(text_search_config: str) -> str:
+    return (
+        f"CREATE INDEX IF NOT EXISTS {FULL_TEXT_INDEX} ON langchain_pg_embedding "
+        f"USING GIN (to_tsvector('{text_search_config}'::regconfig, document))"
+    )
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines Postgres full-text search with PGVector similarity search.
+
+    Both rankings are fused with weighted reciprocal rank fusion:
+    score(doc) = sum(weight / (rrf_k + rank)).
+    """
+
+    vector_store: PGVector
+    engine: AsyncEngine
+    collection_name: str
+    k: int = 4
+    fetch_k: int = 20
+    vector_weight: float = 1.0
+    text_weight: float = 1.0
+    rrf_k: int = 60
+    # Inlined into the query so it matches the expression of the GIN index.
+    text_search_config: str = "english"
+    # Loop the async engine's connections belong to, see _get_relevant_documents.
+    _loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+
+    @field_validator("text_search_config")
+    @classmethod
+    def _validate_text_search_config(cls, value: str) -> str:
+        if not re.fullmatch(r"[a-z_]+", value):
+            raise ValueError(f"Invalid text search configuration: {value}")
+        return value
+
+    @property
+    def search_kwargs(self) -> dict:
+        return {
+            "k": self.k,
+            "fetch_k": self.fetch_k,
+            "vector_weight": self.vector_weight,
+            "text_weight": self.text_weight,
+            "rrf_k": self.rrf_k,
+        }
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """
+        Runs the async search for sync callers. Pooled connections of the
+        async engine are bound to the loop that opened them, so the search
+        is handed to that loop when it is running in another thread, e.g.
+        for a sync tool called from an executor.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            raise RuntimeError(
+                "HybridRetriever.invoke would block the event loop, use ainvoke"
+            )
+        coroutine = self._asearch(query)
+        if self._loop is not None and self._loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+        return asyncio.run(coroutine)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        self._loop = asyncio.get_running_loop()
+        return await self._asearch(query)
+
+    async def _asearch(self, query: str) -> list[Document]:
+        vector_docs, text_docs = await asyncio.gather(
+            self.vector_store.asimilarity_search(query, k=self.fetch_k),
+            self._afull_text_search(query),
+        )
+        return self._fuse(
+            [(vector_docs, self.vector_weight), (text_docs, self.text_weight)]
+        )[: self.k]
+
+    async def _afull_text_search(self, query: str) -> list[Document]:
+        tsvector = f"to_tsvector('{self.text_search_config}'::regconfig, e.document)"
+        tsquery = f"websearch_to_tsquery('{self.text_search_config}'::regconfig, :query)"
+        statement = text(
+            f"""
+            SELECT e.id, e.document, e.cmetadata
+            FROM langchain_pg_embedding e
+            JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+            WHERE c.name = :collection AND {tsvector} @@ {tsquery}
+            ORDER BY ts_rank_cd({tsvector}, {tsquery}) DESC
+            LIMIT :limit
+            """
+        )
+        async with self.engine.connect() as connection:
+            rows = await connection.execute(
+                statement,
+                {"query": query, "collection": self.collection_name, "limit": self.fetch_k},
+            )
+            return [
+                Document(id=row.id, page_content=row.document, metadata=row.cmetadata)
+                for row in rows
+            ]
+
+    def _fuse(self, rankings: list[tuple[list[Document], float]]) -> list[Document]:
+        scores: dict[str, float] = {}
+        docs: dict[str, Document] = {}
+        for ranking, weight in rankings:
+            for rank, doc in enumerate(ranking, start=1):
+                key = doc.id or doc.page_content
+                scores[key] = scores.get(key, 0.0) + weight / (self.rrf_k + rank)
+                docs.setdefault(key, doc)
+        return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
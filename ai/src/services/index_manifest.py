@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    Record of the (size, mtime, sha256) of every indexed document.
+
+    A file whose size and mtime match its entry is unchanged without being
+    read; otherwise it is hashed, so a touched but identical file is not
+    re-indexed. The manifest is a JSON file replaced atomically on save.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self._entries = json.load(file)
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def is_changed(self, path: str) -> bool:
+        """Whether `path` needs indexing. Refreshes the stat of unchanged files."""
+        entry = self._entries.get(self._key(path))
+        stat = os.stat(path)
+        if entry is None:
+            return True
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return False
+        if entry["size"] == stat.st_size and entry["sha256"] == file_sha256(path):
+            entry["mtime"] = stat.st_mtime
+            return False
+        return True
+
+    def removed(self, paths: list[str]) -> list[str]:
+        """Recorded files missing from `paths`."""
+        current = {self._key(path) for path in paths}
+        return [path for path in self._entries if path not in current]
+
+    def record(self, path: str, sha256: Optional[str] = None):
+        stat = os.stat(path)
+        self._entries[self._key(path)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": sha256 or file_sha256(path),
+        }
+
+    def forget(self, path: str):
+        self._entries.pop(self._key(path), None)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._entries, file, indent=2)
+        os.replace(tmp_path, self.path)
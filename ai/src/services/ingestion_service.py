@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import UploadFile
+
+from managers.config_manager import Config
+from models.ingestion_job import IngestionJob
+from services.metrics import INGESTION_CHUNKS, INGESTION_THROUGHPUT
+from services.vector_store_service import VectorStoreService
+
+logger = logging.getLogger("uvicorn.error")
+
+# How often a running job's progress is published to the other workers.
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class IngestionService:
+    """
+    Runs uploaded documents through the vector store as background jobs.
+
+    Uploads are streamed to a temporary file in chunks, parsing runs on a
+    worker pool off the event loop and at most `max_workers` jobs index
+    concurrently. Temporary files are removed once a job finishes. Jobs are
+    published to the shared state, so any worker can report them.
+    """
+
+    def __init__(self, config: Config, vector_store_service: VectorStoreService):
+        ingestion_config = config.get_value("ingestion")
+        self.vector_store_service = vector_store_service
+        self.shared_state = vector_store_service.shared_state
+        self.upload_chunk_size = ingestion_config["upload_chunk_size"]
+        self.upload_dir = ingestion_config["upload_dir"]
+        self.max_finished_jobs = ingestion_config["max_finished_jobs"]
+
+        max_workers = ingestion_config["max_workers"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingestion"
+        )
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+        if self.upload_dir:
+            os.makedirs(self.upload_dir, exist_ok=True)
+
+    async def submit_upload(self, file: UploadFile, file_type: str) -> IngestionJob:
+        path = await self._save_upload(file, file_type)
+        job = IngestionJob(id=uuid.uuid4().hex, filename=file.filename)
+        self._jobs[job.id] = job
+        self.shared_state.save_job(job)
+        self._forget_finished_jobs()
+
+        task = asyncio.create_task(self._run(job, path, file_type))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            # Submitted to another worker.
+            job = self.shared_state.load_job(job_id)
+        return job
+
+    async def _save_upload(self, file: UploadFile, file_type: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=file_type, dir=self.upload_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := await file.read(self.upload_chunk_size):
+                    tmp.write(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return path
+
+    async def _publish_progress(self, job: IngestionJob):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL_SECONDS)
+            self.shared_state.save_job(job)
+
+    async def _run(self, job: IngestionJob, path: str, file_type: str):
+        publisher = None
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                self.shared_state.save_job(job)
+                publisher = asyncio.create_task(self._publish_progress(job))
+                started = time.perf_counter()
+                result = await self.vector_store_service.save_file_to_vector_store(
+                    path=path,
+                    source=job.filename,
+                    file_type=file_type,
+                    job=job,
+                    executor=self._executor,
+                )
+                job.chunks_embedded = result["num_added"] + result["num_updated"]
+                job.chunks_skipped = result["num_skipped"]
+                job.status = "completed"
+                self._record_metrics(job, time.perf_counter() - started)
+                logger.info(f"Ingestion job {job.id} completed: {result}")
+        except Exception as err:
+            logger.error(f"Ingestion job {job.id} failed: {err}")
+            job.status = "failed"
+            job.error = str(err)
+        finally:
+            if publisher is not None:
+                publisher.cancel()
+            job.finished_at = datetime.now(timezone.utc)
+            self.shared_state.save_job(job)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _record_metrics(job: IngestionJob, elapsed: float):
+        INGESTION_CHUNKS.labels("embedded").inc(job.chunks_embedded)
+        INGESTION_CHUNKS.labels("skipped").inc(job.chunks_skipped)
+        if elapsed > 0 and job.chunks_processed:
+            INGESTION_THROUGHPUT.observe(job.chunks_processed / elapsed)
+
+    def _forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+        self.shared_state.forget_finished_jobs(keep=self.max_finished_jobs)
+
+    async def aclose(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+import yaml
+
+INTENTS = ("general", "advisor", "creator", "bestiary", "combat")
+
+INTENT_ALIASES = {
+    "combat_expert": "combat",
+    "rules": "general",
+    "monster": "bestiary",
+    "monsters": "bestiary",
+}
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "can", "do", "does", "for",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to",
+    "what", "when", "which", "with", "you",
+}  # fmt: skip
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def normalize_intent(text: Optional[str], default: str = "general") -> str:
+    """Map a free-form router reply (e.g. `"Combat_Expert."`) onto a valid route."""
+    if not text:
+        return default
+    words = re.findall(r"[a-z_]+", text.lower())
+    for word in words:
+        word = INTENT_ALIASES.get(word, word)
+        if word in INTENTS:
+            return word
+    return default
+
+
+class IntentClassifier:
+    """
+    TF-IDF nearest-centroid classifier trained from labelled example questions.
+
+    `classify` returns the best intent and a confidence in [0, 1], the
+    router falls back to the LLM when the confidence is below its threshold.
+    """
+
+    def __init__(
+        self,
+        examples: Optional[dict[str, list[str]]] = None,
+        min_similarity: float = 0.1,
+    ):
+        self.min_similarity = min_similarity
+        if examples is None:
+            examples = self._load_examples()
+        self._idf: dict[str, float] = {}
+        self._centroids: dict[str, dict[str, float]] = {}
+        self._fit(examples)
+
+    def _load_examples(self) -> dict[str, list[str]]:
+        examples_path = Path(__file__).parent.parent / "config" / "intent_examples.yml"
+        with open(examples_path, "r") as f:
+            return yaml.safe_load(f)
+
+    @staticmethod
+    def _tokenize(text: str) -> list[str]:
+        words = [
+            word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOP_WORDS
+        ]
+        bigrams = [f"{first} {second}" for first, second in zip(words, words[1:])]
+        return words + bigrams
+
+    def _fit(self, examples: dict[str, list[str]]):
+        documents = [
+            (intent, self._tokenize(question))
+            for intent, questions in examples.items()
+            for question in questions
+        ]
+        document_frequency = Counter(
+            term for _, tokens in documents for term in set(tokens)
+        )
+        total = len(documents)
+        self._idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+
+        sums: dict[str, Counter] = {intent: Counter() for intent in examples}
+        for intent, tokens in documents:
+            sums[intent].update(self._vectorize(tokens))
+        self._centroids = {
+            intent: self._normalize(dict(vector)) for intent, vector in sums.items()
+        }
+
+    def _vectorize(self, tokens: list[str]) -> dict[str, float]:
+        counts = Counter(token for token in tokens if token in self._idf)
+        return self._normalize(
+            {term: count * self._idf[term] for term, count in counts.items()}
+        )
+
+    @staticmethod
+    def _normalize(vector: dict[str, float]) -> dict[str, float]:
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return vector
+        return {term: value / norm for term, value in vector.items()}
+
+    def scores(self, question: str) -> dict[str, float]:
+        vector = self._vectorize(self._tokenize(question))
+        return {
+            intent: sum(
+                weight * centroid.get(term, 0.0) for term, weight in vector.items()
+            )
+            for intent, centroid in self._centroids.items()
+        }
+
+    def classify(self, question: str) -> tuple[str, float]:
+        ranked = sorted(self.scores(question).items(), key=lambda x: x[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0:
+            return "general", 0.0
+
+        intent, best = ranked[0]
+        if best < self.min_similarity:
+            return intent, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        # Share of the top score over the top two, so an ambiguous question
+        # that matches two intents equally scores around 0.5.
+        confidence = best / (best + runner_up) if best + runner_up else 0.0
+        return intent, confidence
@@ -0,0 +1,49 @@
+from typing import Callable, Optional
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents.base import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class LazyRetriever(BaseRetriever):
+    """
+    Placeholder for a retriever that only exists once the app started.
+
+    Lets the graph be compiled before the vector store and its connections
+    are created, e.g. in the gunicorn master before workers are forked. With
+    `factory` set, the retriever is only created on the first query.
+    """
+
+    retriever: Optional[BaseRetriever] = None
+    factory: Optional[Callable[[], BaseRetriever]] = None
+
+    def _resolve(self) -> BaseRetriever:
+        if self.retriever is None and self.factory is not None:
+            self.retriever = self.factory()
+        if self.retriever is None:
+            raise RuntimeError("Retriever used before the vector store was initialized")
+        return self.retriever
+
+    @property
+    def search_type(self):
+        return getattr(self.retriever, "search_type", None)
+
+    @property
+    def search_kwargs(self):
+        return getattr(self.retriever, "search_kwargs", None)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self._resolve().invoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return await self._resolve().ainvoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
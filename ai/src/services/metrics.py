@@ -0,0 +1,191 @@
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+NODE_LATENCY = Histogram(
+    "dnd_graph_node_seconds",
+    "Time spent in a LangGraph node",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_LATENCY = Histogram(
+    "dnd_tool_seconds",
+    "Time spent executing a tool call",
+    ["tool", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "dnd_llm_time_to_first_token_seconds",
+    "Time from a chat model call to its first streamed token",
+    ["provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "dnd_llm_tokens_per_second",
+    "Streamed chunks per second after the first token of a chat model call",
+    ["provider", "model"],
+    buckets=(1, 5, 10, 25, 50, 100, 200, 400, 800),
+)
+RETRIEVAL_LATENCY = Histogram(
+    "dnd_retrieval_seconds",
+    "Time spent in a retriever",
+    ["retriever"],
+    buckets=LATENCY_BUCKETS,
+)
+RETRIEVAL_CACHE = Counter(
+    "dnd_retrieval_cache_total",
+    "Retrieval cache lookups",
+    ["result"],
+)
+INGESTION_CHUNKS = Counter(
+    "dnd_ingestion_chunks_total",
+    "Chunks run through ingestion jobs",
+    ["result"],
+)
+EMBEDDING_RATE_LIMITS = Counter(
+    "dnd_embedding_rate_limits_total",
+    "Embedding batches rejected by the provider's rate limit",
+)
+INGESTION_THROUGHPUT = Histogram(
+    "dnd_ingestion_chunks_per_second",
+    "Chunks indexed per second by a finished ingestion job",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+
+class GraphEventMetrics:
+    """
+    Records node, chat model and retriever timings from one run's
+    `astream_events`. Only run ids and timestamps are kept per event, so it
+    is cheap enough to observe every event of the stream.
+    """
+
+    def __init__(self):
+        self._started: dict[str, float] = {}
+        self._first_token: dict[str, float] = {}
+        self._tokens: dict[str, int] = {}
+
+    def observe(self, event: dict):
+        event_type = event["event"]
+        run_id = event.get("run_id")
+        now = time.perf_counter()
+
+        if event_type == "on_chain_start":
+            if self._is_node(event):
+                self._started[run_id] = now
+        elif event_type == "on_chain_end":
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                NODE_LATENCY.labels(event["name"]).observe(now - started)
+
+        elif event_type in ("on_chat_model_start", "on_retriever_start"):
+            self._started[run_id] = now
+        elif event_type == "on_chat_model_stream":
+            if run_id not in self._first_token:
+                self._first_token[run_id] = now
+                started = self._started.get(run_id, now)
+                LLM_TIME_TO_FIRST_TOKEN.labels(*self._model(event)).observe(
+                    now - started
+                )
+            self._tokens[run_id] = self._tokens.get(run_id, 0) + 1
+        elif event_type == "on_chat_model_end":
+            self._started.pop(run_id, None)
+            first_token = self._first_token.pop(run_id, None)
+            tokens = self._tokens.pop(run_id, 0)
+            if first_token is not None and now > first_token and tokens > 1:
+                LLM_TOKENS_PER_SECOND.labels(*self._model(event)).observe(
+                    (tokens - 1) / (now - first_token)
+                )
+        elif event_type == "on_retriever_end":
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                RETRIEVAL_LATENCY.labels(event["name"]).observe(now - started)
+
+    @staticmethod
+    def _is_node(event: dict) -> bool:
+        node = event.get("metadata", {}).get("langgraph_node")
+        return node is not None and event.get("name") == node
+
+    @staticmethod
+    def _model(event: dict) -> tuple[str, str]:
+        metadata = event.get("metadata", {})
+        return (
+            str(metadata.get("ls_provider") or metadata.get("provider") or "unknown"),
+            str(metadata.get("ls_model_name") or metadata.get("model") or "unknown"),
+        )
+
+
+POOL_GAUGES = {
+    metric: Gauge(
+        f"dnd_db_pool_{metric}",
+        f"Database pool {metric}",
+        ["pool"],
+        # One series per live worker when gunicorn runs several.
+        multiprocess_mode="liveall",
+    )
+    for metric in ("checked_out", "overflow", "size", "waiters")
+}
+
+_engine_pools: dict[str, AsyncEngine] = {}
+
+
+def register_engine_pool(engine: AsyncEngine, name: str):
+    """Report `engine`'s pool on /metrics, replacing a previous one of `name`."""
+    _engine_pools[name] = engine
+
+
+def sample_engine_pools():
+    """
+    Copy the state of the registered pools into their gauges. Called on
+    every scrape, and periodically by each worker so the other workers'
+    pools are current in multiprocess mode. Waiters are read from the
+    pool's internal queue, best effort.
+    """
+    for name, engine in _engine_pools.items():
+        pool = engine.sync_engine.pool
+        readers = {
+            "checked_out": getattr(pool, "checkedout", None),
+            "overflow": getattr(pool, "overflow", None),
+            "size": getattr(pool, "size", None),
+            "waiters": lambda: _waiters(pool),
+        }
+        for metric, read in readers.items():
+            value = read() if read is not None else None
+            if value is not None:
+                POOL_GAUGES[metric].labels(name).set(value)
+
+
+def _waiters(pool):
+    queue = getattr(pool, "_pool", None)
+    try:
+        # AsyncAdaptedQueue wraps an asyncio.Queue, the threaded Queue a
+        # Condition, neither exposes its waiters publicly.
+        if hasattr(queue, "_queue"):
+            return len(queue._queue._getters)
+        return len(queue.not_empty._waiters)
+    except AttributeError:
+        return None
+
+
+def generate_metrics() -> bytes:
+    """
+    Exposition of all metrics. With `PROMETHEUS_MULTIPROC_DIR` set (see
+    gunicorn.conf.py) they are aggregated across the workers, whichever
+    worker serves the scrape.
+    """
+    sample_engine_pools()
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,363 @@
+import json
+import os
+import uuid
+from threading import RLock
+from typing import Any, Callable, Iterable, Optional, Sequence
+import numpy as np
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.jsonl"
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Single-node vector store keeping normalized vectors in a memory-mapped
+    float32 matrix and ids, texts and metadata in a JSONL sidecar log.
+
+    Every write appends only the rows it changed to the log, which is
+    compacted once it holds more than twice as many records as rows.
+    Deleted rows are tombstoned and reused by later appends, the matrix
+    grows by doubling its capacity. Search is a vectorized cosine top-k
+    over blocks of `block_rows` rows.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        path: str,
+        initial_capacity: int = 1024,
+        block_rows: int = 65536,
+    ):
+        self.embedding = embedding
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.block_rows = block_rows
+        self._lock = RLock()
+
+        os.makedirs(path, exist_ok=True)
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._ids: list[Optional[str]] = []
+        self._documents: list[Optional[dict]] = []
+        self._positions: dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._log_records = 0
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, VECTORS_FILE)
+
+    @property
+    def _metadata_path(self) -> str:
+        return os.path.join(self.path, METADATA_FILE)
+
+    def _load(self):
+        if not os.path.exists(self._metadata_path):
+            return
+        with open(self._metadata_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A write torn by a crash, only the last line can be.
+                    break
+                self._apply(record)
+                self._log_records += 1
+
+        self._positions = {
+            doc_id: position
+            for position, doc_id in enumerate(self._ids)
+            if doc_id is not None
+        }
+        if self._dim:
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r+",
+                shape=(self._capacity, self._dim),
+            )
+
+    def _apply(self, record: dict):
+        if "capacity" in record:
+            self._dim = record["dim"]
+            self._capacity = record["capacity"]
+            rows = record["rows"]
+        else:
+            rows = record["position"] + 1
+        missing = rows - len(self._ids)
+        if missing > 0:
+            self._ids.extend([None] * missing)
+            self._documents.extend([None] * missing)
+        if "position" in record:
+            self._ids[record["position"]] = record["id"]
+            self._documents[record["position"]] = record["document"]
+
+    def _shape_record(self) -> dict:
+        return {"dim": self._dim, "capacity": self._capacity, "rows": len(self._ids)}
+
+    def _row_record(self, position: int) -> dict:
+        return {
+            "position": position,
+            "id": self._ids[position],
+            "document": self._documents[position],
+        }
+
+    def _persist(self, records: list[dict]):
+        # Vectors first, so the log never points at rows not yet written.
+        if self._matrix is not None:
+            self._matrix.flush()
+        if self._log_records + len(records) > 2 * len(self._ids) + 1:
+            self._compact()
+            return
+        with open(self._metadata_path, "a") as f:
+            f.write("".join(f"{json.dumps(record)}\n" for record in records))
+        self._log_records += len(records)
+
+    def _compact(self):
+        records = [self._shape_record()] + [
+            self._row_record(position)
+            for position, doc_id in enumerate(self._ids)
+            if doc_id is not None
+        ]
+        tmp_path = f"{self._metadata_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("".join(f"{json.dumps(record)}\n" for record in records))
+        os.replace(tmp_path, self._metadata_path)
+        self._log_records = len(records)
+
+    def _grow(self, required: int):
+        capacity = max(self._capacity, self.initial_capacity)
+        while capacity < required:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+
+        tmp_path = f"{self._vectors_path}.tmp"
+        grown = np.memmap(
+            tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self._dim)
+        )
+        if self._matrix is not None:
+            grown[: len(self._ids)] = self._matrix[: len(self._ids)]
+            grown.flush()
+            del self._matrix
+        del grown
+        os.replace(tmp_path, self._vectors_path)
+
+        self._capacity = capacity
+        self._matrix = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self._dim),
+        )
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_vectors(
+        self,
+        vectors: list[list[float]],
+        texts: list[str],
+        metadatas: Optional[list[dict]] = None,
+        ids: Optional[list[str]] = None,
+    ) -> list[str]:
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [doc_id or uuid.uuid4().hex for doc_id in (ids or [None] * len(texts))]
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Expected {self._dim}-dimensional vectors, got {matrix.shape[1]}"
+                )
+
+            # Existing ids are overwritten in place, new ones fill tombstoned
+            # rows first and are appended after that.
+            free = [position for position, doc_id in enumerate(self._ids) if doc_id is None]
+            assigned = dict(self._positions)
+            positions = []
+            for doc_id in ids:
+                if doc_id not in assigned:
+                    if free:
+                        assigned[doc_id] = free.pop()
+                    else:
+                        assigned[doc_id] = len(self._ids)
+                        self._ids.append(None)
+                        self._documents.append(None)
+                positions.append(assigned[doc_id])
+
+            self._grow(len(self._ids))
+            for row, position, doc_id, text, metadata in zip(
+                matrix, positions, ids, texts, metadatas
+            ):
+                self._matrix[position] = row
+                self._ids[position] = doc_id
+                self._documents[position] = {"page_content": text, "metadata": metadata}
+                self._positions[doc_id] = position
+            self._persist(
+                [self._shape_record()]
+                + [self._row_record(position) for position in dict.fromkeys(positions)]
+            )
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        return self.add_vectors(
+            self.embedding.embed_documents(texts), texts, metadatas, ids
+        )
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        return self.add_vectors(
+            await self.embedding.aembed_documents(texts), texts, metadatas, ids
+        )
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids is None:
+            return False
+        with self._lock:
+            deleted = []
+            for doc_id in ids:
+                position = self._positions.pop(doc_id, None)
+                if position is None:
+                    continue
+                self._ids[position] = None
+                self._documents[position] = None
+                self._matrix[position] = 0.0
+                deleted.append(position)
+            if deleted:
+                self._persist([self._row_record(position) for position in deleted])
+        return True
+
+    async def adelete(
+        self, ids: Optional[list[str]] = None, **kwargs: Any
+    ) -> Optional[bool]:
+        return self.delete(ids, **kwargs)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        with self._lock:
+            return [
+                self._to_document(self._positions[doc_id])
+                for doc_id in ids
+                if doc_id in self._positions
+            ]
+
+    def _to_document(self, position: int) -> Document:
+        stored = self._documents[position]
+        return Document(
+            id=self._ids[position],
+            page_content=stored["page_content"],
+            metadata=stored["metadata"],
+        )
+
+    def similarity_search_by_vectors(
+        self, embeddings: list[list[float]], k: int = 4
+    ) -> list[list[tuple[Document, float]]]:
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            rows = len(self._ids)
+            if self._matrix is None or not self._positions:
+                return [[] for _ in embeddings]
+
+            valid = np.fromiter(
+                (doc_id is not None for doc_id in self._ids), dtype=bool, count=rows
+            )
+            scores = np.empty((len(queries), rows), dtype=np.float32)
+            for start in range(0, rows, self.block_rows):
+                end = min(start + self.block_rows, rows)
+                scores[:, start:end] = queries @ self._matrix[start:end].T
+            scores[:, ~valid] = -np.inf
+
+            k = min(k, len(self._positions))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for query_scores, candidates in zip(scores, top):
+                ranked = candidates[np.argsort(-query_scores[candidates])]
+                results.append(
+                    [
+                        (self._to_document(position), float(query_scores[position]))
+                        for position in ranked
+                    ]
+                )
+            return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: list[float], k: int = 4
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vectors([embedding], k)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self.embedding.embed_query(query), k
+        )
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            await self.embedding.aembed_query(query), k
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        path: str = "",
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        store = cls(embedding=embedding, path=path, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
@@ -0,0 +1,62 @@
+from collections import Counter
+from threading import Lock
+
+from managers.config_manager import Config
+
+REVIEW_POLICIES = ("always", "skip", "speculative")
+
+
+class ReviewPolicy:
+    """
+    Decides per intent whether the review node runs after a specialist.
+
+    - always: the user waits for the reviewed answer.
+    - skip: the specialist answer is final.
+    - speculative: the specialist answer is streamed right away and the
+      review only emits a correction when it changes something.
+
+    Answers shorter than `min_answer_chars` are never reviewed.
+    """
+
+    def __init__(self, config: Config):
+        review_config = config.get_value("review")
+        self.default = review_config["default"]
+        self.intents = review_config["intents"] or {}
+        self.min_answer_chars = review_config["min_answer_chars"]
+
+        for policy in [self.default, *self.intents.values()]:
+            if policy not in REVIEW_POLICIES:
+                raise ValueError(f"Unknown review policy: {policy}")
+
+        self._outcomes: dict[str, Counter] = {}
+        self._lock = Lock()
+
+    def policy_for(self, intent: str) -> str:
+        return self.intents.get(intent, self.default)
+
+    def should_review(self, intent: str, answer: str) -> bool:
+        return (
+            self.policy_for(intent) != "skip"
+            and len(answer.strip()) >= self.min_answer_chars
+        )
+
+    @staticmethod
+    def changes(draft: str, reviewed: str) -> bool:
+        return " ".join(draft.split()) != " ".join(reviewed.split())
+
+    def record(self, intent: str, outcome: str):
+        """Count a review outcome: `skipped`, `unchanged` or `changed`."""
+        with self._lock:
+            self._outcomes.setdefault(intent, Counter())[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for intent, outcomes in self._outcomes.items():
+                reviewed = outcomes["changed"] + outcomes["unchanged"]
+                stats[intent] = {
+                    "policy": self.policy_for(intent),
+                    **outcomes,
+                    "change_rate": outcomes["changed"] / reviewed if reviewed else 0.0,
+                }
+            return stats
@@ -0,0 +1,301 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+from langchain_core.documents.base import Document
+from langchain_text_splitters import TextSplitter
+
+from services.context_packer import count_tokens
+
+HEADING_SMALL_WORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "in", "of", "on", "or", "the", "to",
+    "with",
+}
+SPELL_SCHOOL = re.compile(
+    r"^(\d+(st|nd|rd|th)-level [a-z]+( \(ritual\))?|[A-Z][a-z]+ cantrip( \(ritual\))?)$"
+)
+MONSTER_TYPE = re.compile(
+    r"^(Tiny|Small|Medium|Large|Huge|Gargantuan) [a-z ]+(\([a-z, ]+\))?,"
+)
+TABLE_ROW = re.compile(r"^(d\d+\b|\d+(?:[–-]\d+)?\s+\S|\S.*\S(?:\s{2,}|\t)\S)")
+SENTENCE_END = (".", "!", "?", ":", ")")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class _Line:
+    text: str
+    page: Any
+
+
+@dataclass
+class _Section:
+    title: Optional[str]
+    kind: str
+    lines: list[_Line] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self.lines)
+
+
+def _is_heading(text: str) -> bool:
+    if not 3 <= len(text) <= 50 or text[-1] in ".,;:" or not text[0].isupper():
+        return False
+    words = [word for word in re.split(r"[\s-]+", text) if word]
+    if not any(word.isalpha() for word in words):
+        return False
+    return all(
+        word[0].isupper() or word[0].isdigit() or word.lower() in HEADING_SMALL_WORDS
+        for word in words
+    )
+
+
+class RulebookTextSplitter(TextSplitter):
+    """
+    Token-based splitter aware of the layout of D&D rulebooks.
+
+    Tokens are approximated with `count_tokens` unless another
+    `length_function` is given.
+
+    Pages of a source are read as one stream of lines cut into sections at
+    headings. A heading followed by a spell school line starts a `spell`
+    entry, one followed by a creature size and type a `monster` entry.
+    Consecutive sections of the same kind are packed whole up to
+    `chunk_size` tokens; only a section above `max_chunk_size` is split,
+    between tables and paragraphs where possible, and every part keeps the
+    section title. A table or paragraph above the limit on its own is split
+    between rows (repeating the header row) or sentences, so no chunk is
+    longer than `max_chunk_size`. Chunks carry `section` and `entry_type`
+    metadata and the page they start on.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        max_chunk_size: int = 1024,
+        length_function: Callable[[str], int] = count_tokens,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            chunk_size=chunk_size,
+            chunk_overlap=0,
+            length_function=length_function,
+            **kwargs,
+        )
+        self.max_chunk_size = max(chunk_size, max_chunk_size)
+
+    def split_text(self, text: str) -> list[str]:
+        return [
+            chunk.page_content
+            for chunk in self._split_lines(
+                [_Line(line, None) for line in text.splitlines()], {}
+            )
+        ]
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        # Entries run across page breaks, pages of a source are split together.
+        sources: dict[Any, list[Document]] = {}
+        for document in documents:
+            sources.setdefault(document.metadata.get("source"), []).append(document)
+
+        chunks = []
+        for pages in sources.values():
+            lines = [
+                _Line(line, page.metadata.get("page"))
+                for page in pages
+                for line in page.page_content.splitlines()
+            ]
+            chunks.extend(self._split_lines(lines, pages[0].metadata))
+        return chunks
+
+    def _split_lines(self, lines: list[_Line], metadata: dict) -> list[Document]:
+        chunks = []
+        for title, kind, parts in self._pack(self._sections(lines)):
+            for part in parts:
+                chunk_metadata = {**metadata, "entry_type": kind}
+                if title is not None:
+                    chunk_metadata["section"] = title
+                if part[0].page is not None:
+                    chunk_metadata["page"] = part[0].page
+                text = "\n".join(line.text for line in part)
+                chunks.append(Document(page_content=text, metadata=chunk_metadata))
+        return chunks
+
+    def _sections(self, lines: list[_Line]) -> list[_Section]:
+        lines = [
+            _Line(line.text.strip(), line.page) for line in lines if line.text.strip()
+        ]
+        sections = [_Section(title=None, kind="section")]
+        previous = None
+        for position, line in enumerate(lines):
+            starts_block = (
+                previous is None
+                or previous.text.endswith(SENTENCE_END)
+                or _is_heading(previous.text)
+            )
+            if starts_block and _is_heading(line.text):
+                following = (
+                    lines[position + 1].text if position + 1 < len(lines) else ""
+                )
+                if SPELL_SCHOOL.match(following):
+                    kind = "spell"
+                elif MONSTER_TYPE.match(following):
+                    kind = "monster"
+                else:
+                    kind = "section"
+                if sections[-1].lines and sections[-1].lines[-1] is previous and (
+                    _is_heading(previous.text) and len(sections[-1].lines) == 1
+                ):
+                    # Stacked headings, e.g. a chapter and its first section.
+                    sections[-1].title = f"{sections[-1].title} / {line.text}"
+                    sections[-1].kind = kind
+                    sections[-1].lines.append(line)
+                else:
+                    sections.append(_Section(title=line.text, kind=kind, lines=[line]))
+            else:
+                sections[-1].lines.append(line)
+            previous = line
+        return [section for section in sections if section.lines]
+
+    def _pack(self, sections: list[_Section]):
+        """Yield (title, kind, parts), each part being the lines of a chunk."""
+        group: list[_Section] = []
+        group_size = 0
+        for section in sections:
+            size = self._size(section.lines)
+            if size > self.max_chunk_size:
+                if group:
+                    yield self._flush(group)
+                    group, group_size = [], 0
+                yield section.title, section.kind, self._split_section(section)
+                continue
+            if group and (
+                group[0].kind != section.kind or group_size + size > self._chunk_size
+            ):
+                yield self._flush(group)
+                group, group_size = [], 0
+            group.append(section)
+            group_size += size
+        if group:
+            yield self._flush(group)
+
+    @staticmethod
+    def _flush(group: list[_Section]):
+        titles = [section.title for section in group if section.title]
+        title = "; ".join(titles) if titles else None
+        lines = [line for section in group for line in section.lines]
+        return title, group[0].kind, [lines]
+
+    def _units(self, lines: list[_Line]) -> list[list[_Line]]:
+        """Group lines so a table (3+ consecutive rows) stays together."""
+        units: list[list[_Line]] = []
+        rows: list[_Line] = []
+        for line in lines:
+            if TABLE_ROW.match(line.text):
+                rows.append(line)
+                continue
+            if len(rows) >= 3:
+                units.append(rows)
+            else:
+                units.extend([row] for row in rows)
+            rows = []
+            units.append([line])
+        if len(rows) >= 3:
+            units.append(rows)
+        else:
+            units.extend([row] for row in rows)
+        return units
+
+    def _size(self, lines: list[_Line]) -> int:
+        # With the newline joining it to the next lines, so sizes add up to
+        # at least the size of the joined chunk.
+        return self._length_function("\n".join(line.text for line in lines) + "\n")
+
+    def _fit(self, unit: list[_Line], limit: int) -> list[list[_Line]]:
+        """Split a unit above `limit` between table rows, then inside lines."""
+        if self._size(unit) <= limit:
+            return [unit]
+        if len(unit) == 1:
+            line = unit[0]
+            return [[_Line(text, line.page)] for text in self._fit_text(line, limit)]
+
+        header, groups = unit[0], []
+        current = [header]
+        for row in unit[1:]:
+            if len(current) > 1 and self._size([*current, row]) > limit:
+                groups.append(current)
+                current = [header]
+            current.append(row)
+        groups.append(current)
+        return [
+            fitted
+            for group in groups
+            for fitted in (
+                [group]
+                if self._size(group) <= limit
+                else [part for line in group for part in self._fit([line], limit)]
+            )
+        ]
+
+    def _fit_text(self, line: _Line, limit: int) -> list[str]:
+        if self._size([line]) <= limit:
+            return [line.text]
+        pieces = SENTENCE_BREAK.split(line.text)
+        if len(pieces) == 1:
+            pieces = line.text.split()
+        if len(pieces) == 1:
+            middle = len(line.text) // 2
+            pieces = [line.text[:middle], line.text[middle:]]
+
+        texts, current = [], ""
+        for piece in pieces:
+            candidate = f"{current} {piece}" if current else piece
+            if current and self._size([_Line(candidate, line.page)]) > limit:
+                texts.append(current)
+                current = piece
+            else:
+                current = candidate
+        texts.append(current)
+        # A single sentence or word can still be above the limit.
+        return [
+            fitted
+            for text in texts
+            for fitted in self._fit_text(_Line(text, line.page), limit)
+        ]
+
+    def _split_section(self, section: _Section) -> list[list[_Line]]:
+        title = [_Line(section.title, None)] if section.title else []
+        title_size = self._size(title) if title else 0
+        limit = max(1, self.max_chunk_size - title_size)
+        units = [
+            fitted
+            for unit in self._units(section.lines)
+            for fitted in self._fit(unit, limit)
+        ]
+
+        parts: list[list[_Line]] = []
+        current: list[list[_Line]] = []
+        size = 0
+        for unit in units:
+            unit_size = self._size(unit)
+            if current and size + unit_size > self.max_chunk_size:
+                cut = len(current)
+                # Prefer ending the part on a sentence boundary, when the
+                # rest still fits in the next part with the title.
+                for position in range(len(current) - 1, len(current) // 2, -1):
+                    if current[position][-1].text.endswith(SENTENCE_END):
+                        rest = sum(self._size(kept) for kept in current[position + 1 :])
+                        if title_size + rest + unit_size <= self.max_chunk_size:
+                            cut = position + 1
+                        break
+                parts.append([line for kept in current[:cut] for line in kept])
+                current = current[cut:]
+                if title:
+                    page = current[0][0].page if current else unit[0].page
+                    current.insert(0, [_Line(section.title, page)])
+                size = sum(self._size(kept) for kept in current)
+            current.append(unit)
+            size += unit_size
+        if current:
+            parts.append([line for kept in current for line in kept])
+        return parts
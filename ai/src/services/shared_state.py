@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Optional
+
+from models.ingestion_job import IngestionJob
+
+
+class SharedState:
+    """
+    State the workers of one host must agree on, kept in a SQLite file.
+
+    Holds the index version, which invalidates the retrieval and answer
+    caches of every worker after an ingest, and ingestion jobs, so a job
+    can be polled on any worker. Connections are opened per process, after
+    gunicorn forked the workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id TEXT PRIMARY KEY,
+                job TEXT NOT NULL,
+                finished INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        connection.commit()
+        return connection
+
+    def index_version(self) -> int:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value FROM counters WHERE name = 'index_version'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump_index_version(self) -> int:
+        with self._lock:
+            connection = self.connection
+            connection.execute(
+                "INSERT INTO counters VALUES ('index_version', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+            connection.commit()
+            return connection.execute(
+                "SELECT value FROM counters WHERE name = 'index_version'"
+            ).fetchone()[0]
+
+    def save_job(self, job: IngestionJob):
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO ingestion_jobs VALUES (?, ?, ?, ?)",
+                (job.id, job.model_dump_json(), int(job.is_finished), time.time()),
+            )
+            self.connection.commit()
+
+    def load_job(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT job FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return IngestionJob.model_validate_json(row[0]) if row else None
+
+    def forget_finished_jobs(self, keep: int):
+        with self._lock:
+            self.connection.execute(
+                """
+                DELETE FROM ingestion_jobs WHERE finished = 1 AND id NOT IN (
+                    SELECT id FROM ingestion_jobs WHERE finished = 1
+                    ORDER BY updated_at DESC LIMIT ?
+                )
+                """,
+                (keep,),
+            )
+            self.connection.commit()
@@ -0,0 +1,176 @@
+import asyncio
+import fcntl
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from managers.config_manager import Config
+from models.indexing_status import IndexingStatus
+from services.index_manifest import IndexManifest
+from services.vector_store_service import VectorStoreService
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class StartupIndexer:
+    """
+    Brings the index up to date with `documents_path` in the background.
+
+    Only PDFs that are new or changed according to the `IndexManifest` are
+    parsed and indexed, documents of deleted PDFs are removed. The manifest
+    is saved after every file, so an interrupted run resumes where it
+    stopped. A file failing `max_attempts` times is skipped and reported in
+    `files_failed`; it is left out of the manifest and retried on the next
+    start.
+
+    With several workers, the one holding the lock next to the manifest
+    is the leader: it alone indexes and publishes its status to a file the
+    other workers report from.
+    """
+
+    def __init__(self, config: Config, vector_store_service: VectorStoreService):
+        indexing_config = config.get_value("startup_indexing")
+        self.enabled = indexing_config["enabled"]
+        self.documents_path = config.get_value("documents_path")
+        self.manifest_path = indexing_config["manifest_path"]
+        self.status_path = f"{self.manifest_path}.status.json"
+        self.max_attempts = indexing_config["max_attempts"]
+        self.retry_delay = indexing_config["retry_delay_seconds"]
+        self.vector_store_service = vector_store_service
+        self.manifest: Optional[IndexManifest] = None
+        self.is_leader = False
+        self._status = IndexingStatus()
+        self._lock_file = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> IndexingStatus:
+        if self.is_leader or not self.enabled:
+            return self._status
+        try:
+            with open(self.status_path, "r") as file:
+                return IndexingStatus.model_validate_json(file.read())
+        except (OSError, ValueError):
+            return self._status
+
+    def start(self):
+        if not self.enabled or self.documents_path is None:
+            self.enabled = False
+            self._status.status = "ready"
+            return
+        self.is_leader = self._acquire_leadership()
+        if not self.is_leader:
+            logger.info("Startup indexing runs in another worker")
+            return
+        self.manifest = IndexManifest(self.manifest_path)
+        self._task = asyncio.create_task(self._run())
+
+    def _acquire_leadership(self) -> bool:
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Kept open for the life of the process, the lock is released when
+        # the leader exits.
+        self._lock_file = open(f"{self.manifest_path}.lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _publish(self):
+        tmp_path = f"{self.status_path}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(self._status.model_dump_json())
+        os.replace(tmp_path, self.status_path)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        status = self._status
+        status.status = "running"
+        status.started_at = datetime.now(timezone.utc)
+        self._publish()
+        try:
+            paths = self.vector_store_service.pdf_parser.list_pdfs(self.documents_path)
+            changed = [
+                path
+                for path in paths
+                if await loop.run_in_executor(None, self.manifest.is_changed, path)
+            ]
+            removed = self.manifest.removed(paths)
+            status.files_total = len(paths)
+            status.files_changed = len(changed)
+            self._publish()
+            logger.info(
+                f"Startup indexing: {len(changed)} of {len(paths)} PDFs changed, "
+                f"{len(removed)} removed"
+            )
+
+            for path in removed:
+                if await self._attempt(path, self._aremove):
+                    status.files_removed += 1
+                self._publish()
+
+            for path in changed:
+                status.current_file = os.path.basename(path)
+                self._publish()
+                if await self._attempt(path, self._aindex):
+                    status.files_indexed += 1
+
+            self.manifest.save()
+            status.status = "ready"
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            logger.error(f"Startup indexing failed: {err}")
+            status.status = "failed"
+            status.error = str(err)
+        finally:
+            status.current_file = None
+            status.finished_at = datetime.now(timezone.utc)
+            self._publish()
+
+    async def _aremove(self, path: str):
+        await self.vector_store_service.adelete_source(os.path.basename(path))
+        self.manifest.forget(path)
+        self.manifest.save()
+
+    async def _aindex(self, path: str):
+        await self.vector_store_service.aadd_to_vector_store(path)
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.manifest.record, path
+        )
+        self.manifest.save()
+
+    async def _attempt(self, path: str, action) -> bool:
+        """Run `action(path)` up to `max_attempts` times, False if it never worked."""
+        filename = os.path.basename(path)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await action(path)
+                self._status.files_failed.pop(filename, None)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                if attempt == self.max_attempts:
+                    logger.error(f"Startup indexing skipped {filename}: {err}")
+                    self._status.files_failed[filename] = str(err)
+                    return False
+                logger.warning(
+                    f"Startup indexing of {filename} failed "
+                    f"(attempt {attempt} of {self.max_attempts}), retrying: {err}"
+                )
+                await asyncio.sleep(self.retry_delay * attempt)
+        return False
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
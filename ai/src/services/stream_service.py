@@ -0,0 +1,124 @@
+import json
+import logging
+from typing import AsyncIterator, Callable, Optional
+
+from managers.config_manager import Config
+from services.intent_classifier import INTENTS
+from services.metrics import GraphEventMetrics
+from services.review_policy import ReviewPolicy
+from services.workflow_service import SPECULATIVE_TAG
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def format_event(event_type: str, **data) -> str:
+    payload = json.dumps({"type": event_type, **data})
+    return f"data: {payload}\n\n"
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", None)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return ""
+
+
+class StreamService:
+    """
+    Turns LangGraph `astream_events` into typed SSE events.
+
+    Only tokens produced inside the configured answer nodes reach the client,
+    every event carries its originating node:
+
+    - node_start: a graph node started running
+    - token: a piece of the answer
+    - correction: the speculative review changed the streamed answer
+    - error: the run failed
+    - done: the run finished
+    """
+
+    def __init__(self, config: Config, review_policy: ReviewPolicy):
+        self.answer_nodes = set(config.get_value("streaming")["answer_nodes"])
+        self.review_policy = review_policy
+
+    async def astream(
+        self,
+        events: AsyncIterator[dict],
+        on_answer: Optional[Callable[[str], None]] = None,
+    ) -> AsyncIterator[str]:
+        intent = "general"
+        answers: dict[str, list[str]] = {}
+        last_answer_node = None
+        correction = None
+        # Under the "always" policy the draft is only shown when the review
+        # ends up not running, e.g. for answers that are too short.
+        held_back: dict[str, list[str]] = {}
+        metrics = GraphEventMetrics()
+
+        try:
+            async for event in events:
+                metrics.observe(event)
+                event_type = event["event"]
+                event_name = event.get("name", "")
+                node = event.get("metadata", {}).get("langgraph_node")
+                policy = self.review_policy.policy_for(intent)
+
+                if SPECULATIVE_TAG in event.get("tags", []):
+                    continue
+
+                if event_type == "on_chain_start" and node and event_name == node:
+                    if node == "review" and policy == "always":
+                        held_back.clear()
+                    yield format_event("node_start", node=node)
+
+                elif event_type == "on_chain_end" and node and event_name == node:
+                    output = event["data"].get("output")
+                    if not isinstance(output, dict):
+                        continue
+                    if node == "router" and output.get("intent"):
+                        intent = output["intent"]
+                    elif (
+                        node == "review"
+                        and policy == "speculative"
+                        and output.get("review_changed")
+                    ):
+                        correction = output["messages"][-1].content
+                        yield format_event("correction", node=node, content=correction)
+
+                elif event_type == "on_chat_model_stream":
+                    if node not in self.answer_nodes:
+                        continue
+                    if node == "review" and policy == "speculative":
+                        continue
+                    text = _chunk_text(event["data"]["chunk"])
+                    if not text:
+                        continue
+                    if node in INTENTS and policy == "always":
+                        held_back.setdefault(node, []).append(text)
+                        continue
+                    answers.setdefault(node, []).append(text)
+                    last_answer_node = node
+                    yield format_event("token", node=node, content=text)
+
+            for node, texts in held_back.items():
+                answers[node] = texts
+                last_answer_node = node
+                yield format_event("token", node=node, content="".join(texts))
+
+            yield format_event("done")
+
+        except Exception as e:
+            logger.error(f"Stream error: {str(e)}")
+            yield format_event("error", error=str(e))
+            return
+
+        if on_answer is not None:
+            if correction is not None:
+                on_answer(correction)
+            elif last_answer_node is not None:
+                on_answer("".join(answers[last_answer_node]))
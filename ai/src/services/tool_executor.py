@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import time
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from services.agent_state import AgentState
+from services.metrics import TOOL_LATENCY
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ToolExecutor:
+    """
+    Graph node executing the tool calls of the last AI message.
+
+    Independent calls run concurrently, at most `max_concurrency` at a time.
+    Identical (tool, args) calls are executed once per request, results are
+    remembered in the `tool_cache` state key, which the router resets every
+    turn. A call exceeding `timeout_seconds` yields a partial result instead
+    of stalling the graph.
+    """
+
+    def __init__(self, tools, max_concurrency: int, timeout_seconds: float):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+
+    @staticmethod
+    def _key(tool_call: dict) -> str:
+        args = json.dumps(tool_call["args"], sort_keys=True, default=str)
+        return f"{tool_call['name']}:{args}"
+
+    @staticmethod
+    def _to_content(output) -> str:
+        if isinstance(output, str):
+            return output
+        try:
+            return json.dumps(output, ensure_ascii=False)
+        except TypeError:
+            return str(output)
+
+    async def _run(
+        self, tool_call: dict, semaphore: asyncio.Semaphore, config: RunnableConfig
+    ) -> tuple[str, str]:
+        name = tool_call["name"]
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return (
+                f"Error: {name} is not a valid tool, "
+                f"try one of {list(self.tools_by_name)}.",
+                "error",
+            )
+
+        async with semaphore:
+            started = time.perf_counter()
+            content, status = await self._invoke(tool, tool_call, config)
+            TOOL_LATENCY.labels(name, status).observe(time.perf_counter() - started)
+            return content, status
+
+    async def _invoke(
+        self, tool, tool_call: dict, config: RunnableConfig
+    ) -> tuple[str, str]:
+        name = tool_call["name"]
+        try:
+            output = await asyncio.wait_for(
+                tool.ainvoke(tool_call["args"], config), self.timeout_seconds
+            )
+            return self._to_content(output), "success"
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {name} timed out after {self.timeout_seconds}s")
+            return (
+                f"Partial result: {name} did not respond within "
+                f"{self.timeout_seconds}s, answer with the information you have.",
+                "error",
+            )
+        except Exception as e:
+            logger.error(f"Tool {name} failed: {e}")
+            return f"Error: {repr(e)}\n Please fix your mistakes.", "error"
+
+    async def __call__(self, state: AgentState, config: RunnableConfig) -> AgentState:
+        tool_calls = state["messages"][-1].tool_calls
+        cache = dict(state.get("tool_cache") or {})
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        pending = {}
+        for tool_call in tool_calls:
+            key = self._key(tool_call)
+            if key not in cache and key not in pending:
+                pending[key] = self._run(tool_call, semaphore, config)
+        results = dict(zip(pending, await asyncio.gather(*pending.values())))
+
+        messages = []
+        for tool_call in tool_calls:
+            key = self._key(tool_call)
+            if key in cache:
+                content, status = cache[key], "success"
+            else:
+                content, status = results[key]
+            messages.append(
+                ToolMessage(
+                    content=content,
+                    name=tool_call["name"],
+                    tool_call_id=tool_call["id"],
+                    status=status,
+                )
+            )
+
+        cache.update(
+            {
+                key: content
+                for key, (content, status) in results.items()
+                if status == "success"
+            }
+        )
+        return {"messages": messages, "tool_cache": cache}
@@ -1,19 +1,41 @@
+import asyncio
+import hashlib
+import json
 import os
-import tempfile
-from fastapi import UploadFile
-from sqlalchemy.ext.asyncio import create_async_engine
-from langchain.vectorstores import VectorStore
+import uuid
+from concurrent.futures import Executor
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 from langchain_core.vectorstores.base import BaseRetriever
 from langchain_core.documents.base import Document
-from langchain_postgres.vectorstores import PGVector
 from langchain.indexes import aindex
-from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
 from langchain.indexes import SQLRecordManager
-from langchain_community.document_loaders.pdf import PyPDFDirectoryLoader, PyPDFLoader
-from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from managers.config_manager import Config
+from models.ingestion_job import IngestionJob
 from models.singleton_meta import SingletonMeta
+from services.ann_index_service import AnnIndexService
+from services.cached_embeddings import CachedEmbeddings
+from services.cached_retriever import CachedRetriever, RetrievalCache
+from services.connection_budget import ConnectionBudget
+from services.context_packer import ContextPackingRetriever
+from services.embedding_pipeline import EmbeddingPipeline, EmbeddingProgress
+from services.pdf_parser import ParallelPdfParser
+from services.rulebook_splitter import RulebookTextSplitter
+from services.shared_state import SharedState
+
+
+def chunk_key(doc: Document) -> str:
+    """
+    Record manager key of a chunk, passed to `aindex` as its key encoder so
+    unchanged chunks can be looked up before anything is embedded.
+    """
+    metadata = json.dumps(doc.metadata, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{doc.page_content}\0{metadata}".encode()).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, digest))
 
 
 class VectorStoreService(metaclass=SingletonMeta):
@@ -25,31 +47,79 @@ class VectorStoreService(metaclass=SingletonMeta):
             await instance.aadd_to_vector_store()
         return instance
 
+    async def acreate_search_indexes(self):
+        """
+        Create the full-text and ANN indexes and prewarm them. Queries work
+        without them, so this can run after the service started serving.
+        """
+        if self.backend != "pgvector":
+            return
+        # PGVector creates its tables on first async use, the indexes need them.
+        await self.vector_store.__apost_init__()
+        if self.config.get_value("retrieval")["mode"] == "hybrid":
+            await self.acreate_full_text_index()
+        await self.ann_index.acreate()
+        await self.ann_index.aprewarm()
+
     def __init__(self, config: Config):
+        # The embedding client and the vector store, with their SDK imports,
+        # are created on first use, see `embeddings` and `vector_store`.
         self.config = config
         connection = config.get_value("vector_store")["conn_str"]
         if connection == "no_free_database":
             connection = os.getenv("POSTGRES_TEG")
-        collection_name = config.get_value("vector_store")["collection_name"]
-        embeddings = GoogleGenerativeAIEmbeddings(model=config.get_value("model_name"))
-        # environment must have GOOGLE_API_KEY variable or pass it throgh kwargs
+        embedding_cache = config.get_value("embedding_cache")
+        self._embeddings = CachedEmbeddings(
+            underlying=None,
+            underlying_factory=self._create_embeddings,
+            model_name=config.get_value("model_name"),
+            path=embedding_cache["path"],
+            batch_size=embedding_cache["batch_size"],
+            query_cache_size=embedding_cache["query_cache_size"],
+        )
+        self.embedding_pipeline = EmbeddingPipeline(config, self._embeddings)
+        # Shared by the workers, an ingest on one invalidates the caches of all.
+        self.shared_state = SharedState(config.get_value("server")["shared_state_path"])
+        self._index_listeners = []
 
-        self._async_engine = create_async_engine(
-            connection,
-            pool_size=10,
-            pool_pre_ping=True,
-            max_overflow=20,
-            pool_timeout=30,
-            pool_recycle=1800,
+        retrieval_cache = config.get_value("retrieval_cache")
+        self.retrieval_cache = RetrievalCache(
+            index_version=self.shared_state.index_version,
+            max_entries=retrieval_cache["max_entries"],
+            ttl_seconds=retrieval_cache["ttl_seconds"],
         )
 
-        self._vector_store = PGVector(
-            embeddings=embeddings,
-            collection_name=collection_name,
-            connection=self._async_engine,
-            use_jsonb=True,
-            create_extension=True,
-            async_mode=True,
+        self.backend = config.get_value("vector_store")["backend"]
+        embedding_length = config.get_value("vector_store")["embedding_length"]
+        ann_config = config.get_value("ann_index")
+        self._vector_store: Optional[VectorStore] = None
+        if self.backend == "mmap":
+            # Workers would each load their own copy and overwrite each
+            # other's appends, see ConnectionBudget.workers_from_config.
+            if int(os.getenv("WEB_CONCURRENCY") or 1) > 1:
+                raise ValueError("The mmap vector store runs a single worker")
+            mmap_config = config.get_value("vector_store")["mmap"]
+            # Only the record manager needs SQL on single-node deployments.
+            self._async_engine = create_async_engine(
+                mmap_config["record_manager_url"]
+            )
+            ann_config = {**ann_config, "enabled": False}
+        else:
+            # Creating the engine does not connect yet.
+            budget = ConnectionBudget.from_config(config)
+            self._async_engine = create_async_engine(
+                connection,
+                pool_size=budget.engine_pool_size,
+                pool_pre_ping=True,
+                max_overflow=budget.engine_max_overflow,
+                pool_timeout=30,
+                pool_recycle=1800,
+            )
+
+        self.ann_index = AnnIndexService(
+            engine=self._async_engine,
+            ann_config=ann_config,
+            embedding_length=embedding_length,
         )
 
         self._record_manager = SQLRecordManager(
@@ -58,24 +128,37 @@ class VectorStoreService(metaclass=SingletonMeta):
             async_mode=True,
         )
 
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=150,
-            separators=[
-                "\n\n",
-                "\n",
-                " ",
-                ".",
-                ",",
-                "\u200b",  # Zero-width space
-                "\uff0c",  # Fullwidth comma
-                "\u3001",  # Ideographic comma
-                "\uff0e",  # Fullwidth full stop
-                "\u3002",  # Ideographic full stop
-                "",
-            ],
+        parsing_config = config.get_value("parsing")
+        self.pdf_parser = ParallelPdfParser(
+            max_workers=parsing_config["max_workers"],
+            pages_per_task=parsing_config["pages_per_task"],
         )
 
+        splitter_config = config.get_value("splitter")
+        if splitter_config["type"] == "rulebook":
+            self.splitter = RulebookTextSplitter(
+                chunk_size=splitter_config["chunk_size"],
+                max_chunk_size=splitter_config["max_chunk_size"],
+            )
+        else:
+            self.splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=150,
+                separators=[
+                    "\n\n",
+                    "\n",
+                    " ",
+                    ".",
+                    ",",
+                    "\u200b",  # Zero-width space
+                    "\uff0c",  # Fullwidth comma
+                    "\u3001",  # Ideographic comma
+                    "\uff0e",  # Fullwidth full stop
+                    "\u3002",  # Ideographic full stop
+                    "",
+                ],
+            )
+
     async def aadd_to_vector_store(self, path=None):
         if path is None:
             doc_path = self.config.get_value("documents_path")
@@ -85,11 +168,8 @@ class VectorStoreService(metaclass=SingletonMeta):
         if doc_path is None:
             return
 
-        if os.path.isdir(doc_path):
-            loader = PyPDFDirectoryLoader(path=doc_path)
-        else:
-            loader = PyPDFLoader(file_path=doc_path)
-        splitted_docs = [
+        pages = await self.pdf_parser.aparse(self.pdf_parser.list_pdfs(doc_path))
+        chunks = [
             Document(
                 page_content=doc.page_content,
                 metadata={
@@ -97,49 +177,212 @@ class VectorStoreService(metaclass=SingletonMeta):
                     "source": os.path.basename(doc.metadata["source"]),
                 },
             )
-            for doc in loader.load_and_split(self.splitter)
+            for doc in await asyncio.get_running_loop().run_in_executor(
+                None, self.splitter.split_documents, pages
+            )
         ]
+        new_chunks = await self._anew_chunks(chunks)
+        await self.embedding_pipeline.aembed([doc.page_content for doc in new_chunks])
 
-        return aindex(
-            docs_source=splitted_docs,
+        result = await aindex(
+            docs_source=chunks,
             record_manager=self._record_manager,
             cleanup="incremental",
             source_id_key="source",
             vector_store=self.vector_store,
+            key_encoder=chunk_key,
         )
+        return self._on_indexed(result)
 
-    async def save_file_to_vector_store(self, file: UploadFile, file_type: str):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_type) as tmp:
-            tmp.write(await file.read())
-            tmp.flush()
-            if file_type == ".pdf":
-                loader = PyPDFLoader(file_path=tmp.name)
-            elif file_type == ".txt":
-                loader = TextLoader(file_path=tmp.name)
-            else:
-                raise NotImplementedError(
-                    f"Support for this {file.content_type} type is not implemented yet"
-                )
-            splitted_docs = [
-                Document(
-                    page_content=doc.page_content,
-                    metadata={**doc.metadata, "source": file.filename},
-                )
-                for doc in loader.load_and_split(self.splitter)
-            ]
-
-            return await aindex(
-                docs_source=splitted_docs,
-                record_manager=self._record_manager,
-                cleanup="incremental",
-                source_id_key="source",
-                vector_store=self.vector_store,
-                batch_size=len(splitted_docs),
+    async def save_file_to_vector_store(
+        self,
+        path: str,
+        source: str,
+        file_type: str,
+        job: Optional[IngestionJob] = None,
+        executor: Optional[Executor] = None,
+    ):
+        loop = asyncio.get_running_loop()
+        pages = await loop.run_in_executor(executor, self._load_file, path, file_type)
+        if job is not None:
+            job.pages_parsed = len(pages)
+
+        chunks = [
+            Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "source": source},
+            )
+            for doc in await loop.run_in_executor(
+                executor, self.splitter.split_documents, pages
             )
+        ]
+        new_chunks = await self._anew_chunks(chunks)
+        if job is not None:
+            job.chunks_total = len(chunks)
+
+        def on_progress(progress: EmbeddingProgress):
+            if job is not None:
+                job.batches_total = progress.batches_total
+                job.batches_embedded = progress.batches_done
+                job.embeddings_per_second = progress.texts_per_second
+
+        await self.embedding_pipeline.aembed(
+            [doc.page_content for doc in new_chunks], on_progress=on_progress
+        )
+
+        result = await aindex(
+            docs_source=self._track_progress(chunks, job),
+            record_manager=self._record_manager,
+            cleanup="incremental",
+            source_id_key="source",
+            vector_store=self.vector_store,
+            batch_size=self.config.get_value("ingestion")["batch_size"],
+            key_encoder=chunk_key,
+        )
+        return self._on_indexed(result)
+
+    async def _anew_chunks(self, chunks: list[Document]) -> list[Document]:
+        """Chunks the record manager does not know yet, the ones aindex writes."""
+        if not chunks:
+            return []
+        exists = await self._record_manager.aexists([chunk_key(doc) for doc in chunks])
+        return [doc for doc, found in zip(chunks, exists) if not found]
+
+    async def adelete_source(self, source: str):
+        """Remove every indexed chunk of `source`."""
+        keys = await self._record_manager.alist_keys(group_ids=[source])
+        if not keys:
+            return
+        await self.vector_store.adelete(keys)
+        await self._record_manager.adelete_keys(keys)
+        self._on_indexed({"num_added": 0, "num_updated": 0, "num_deleted": len(keys)})
+
+    @staticmethod
+    def _load_file(path: str, file_type: str) -> list[Document]:
+        from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+        if file_type == ".pdf":
+            loader = PyPDFLoader(file_path=path)
+        elif file_type == ".txt":
+            loader = TextLoader(file_path=path)
+        else:
+            raise NotImplementedError(
+                f"Support for this {file_type} type is not implemented yet"
+            )
+        return loader.load()
+
+    @staticmethod
+    async def _track_progress(docs: list[Document], job: Optional[IngestionJob]):
+        for doc in docs:
+            yield doc
+            if job is not None:
+                job.chunks_processed += 1
+
+    async def acreate_full_text_index(self):
+        from services.hybrid_retriever import create_full_text_index_sql
+
+        text_search_config = self.config.get_value("retrieval")["text_search_config"]
+        async with self._async_engine.begin() as connection:
+            await connection.execute(
+                text(create_full_text_index_sql(text_search_config))
+            )
+
+    async def aclose(self):
+        self.pdf_parser.shutdown()
+        await self._async_engine.dispose()
+
+    def add_index_listener(self, listener):
+        """Register a callback run after indexing changed the vector store."""
+        self._index_listeners.append(listener)
+
+    def _on_indexed(self, result):
+        if result["num_added"] or result["num_updated"] or result["num_deleted"]:
+            self.shared_state.bump_index_version()
+            for listener in self._index_listeners:
+                listener()
+        return result
+
+    def _create_embeddings(self) -> Embeddings:
+        from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+
+        # environment must have GOOGLE_API_KEY variable or pass it throgh kwargs
+        return GoogleGenerativeAIEmbeddings(model=self.config.get_value("model_name"))
+
+    def _create_vector_store(self) -> VectorStore:
+        vector_store_config = self.config.get_value("vector_store")
+        if self.backend == "mmap":
+            from services.mmap_vector_store import MmapVectorStore
+
+            return MmapVectorStore(
+                embedding=self._embeddings, path=vector_store_config["mmap"]["path"]
+            )
+
+        from langchain_postgres.vectorstores import PGVector
+
+        return PGVector(
+            embeddings=self._embeddings,
+            embedding_length=vector_store_config["embedding_length"],
+            collection_name=vector_store_config["collection_name"],
+            connection=self._async_engine,
+            use_jsonb=True,
+            create_extension=True,
+            async_mode=True,
+        )
 
     @property
     def vector_store(self) -> VectorStore:
+        if self._vector_store is None:
+            self._vector_store = self._create_vector_store()
         return self._vector_store
 
+    @property
+    def index_version(self) -> int:
+        return self.shared_state.index_version()
+
+    @property
+    def embeddings(self) -> CachedEmbeddings:
+        return self._embeddings
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._async_engine
+
     def as_retriever(self, **kwargs) -> BaseRetriever:
-        return self.vector_store.as_retriever(kwargs=kwargs)
+        retrieval = self.config.get_value("retrieval")
+        packing = self.config.get_value("context_packing")
+        # The packer needs more candidates than it returns to choose from.
+        k = packing["fetch_k"] if packing["enabled"] else retrieval["k"]
+        if retrieval["mode"] == "hybrid" and self.backend == "pgvector":
+            from services.hybrid_retriever import HybridRetriever
+
+            retriever = HybridRetriever(
+                vector_store=self.vector_store,
+                engine=self._async_engine,
+                collection_name=self.config.get_value("vector_store")[
+                    "collection_name"
+                ],
+                k=k,
+                fetch_k=max(k, retrieval["fetch_k"]),
+                vector_weight=retrieval["vector_weight"],
+                text_weight=retrieval["text_weight"],
+                rrf_k=retrieval["rrf_k"],
+                text_search_config=retrieval["text_search_config"],
+                **kwargs,
+            )
+        else:
+            retriever = self.vector_store.as_retriever(
+                **{"search_kwargs": {"k": k}, **kwargs}
+            )
+        if packing["enabled"]:
+            retriever = ContextPackingRetriever(
+                retriever=retriever,
+                embeddings=self.embeddings,
+                max_tokens=packing["max_tokens"],
+                mmr_lambda=packing["mmr_lambda"],
+                duplicate_threshold=packing["duplicate_threshold"],
+                min_overlap_chars=packing["min_overlap_chars"],
+                max_overlap_chars=packing["max_overlap_chars"],
+            )
+        if not self.config.get_value("retrieval_cache")["enabled"]:
+            return retriever
+        return CachedRetriever(retriever=retriever, cache=self.retrieval_cache)
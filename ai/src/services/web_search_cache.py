@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Optional
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+
+SearchFunction = Callable[[str], Awaitable[Any]]
+
+
+class WebSearchInput(BaseModel):
+    query: str = Field(description="search query to look up")
+
+
+class WebSearchCache:
+    """
+    SQLite-backed cache of web search results keyed by the normalized query.
+
+    Entries expire after `ttl_seconds`, the least recently used ones are
+    evicted once the cache holds more than `max_entries`.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Opened on first use in each process, a SQLite connection must not
+        # be shared by workers forked after the cache was created.
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS web_search (
+                key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        connection.commit()
+        return connection
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get(self, query: str, allow_expired: bool = False) -> Optional[Any]:
+        key = self.normalize(query)
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT results, created_at FROM web_search WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (
+                not allow_expired and now - row[1] > self.ttl_seconds
+            ):
+                self.misses += 1
+                return None
+            self.connection.execute(
+                "UPDATE web_search SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.connection.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, query: str, results: Any):
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO web_search VALUES (?, ?, ?, ?)",
+                (self.normalize(query), json.dumps(results, default=str), now, now),
+            )
+            self.connection.execute(
+                "DELETE FROM web_search WHERE key NOT IN "
+                "(SELECT key FROM web_search ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self.connection.execute("SELECT COUNT(*) FROM web_search").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def is_search_results(results) -> bool:
+    return isinstance(results, list) and all(
+        isinstance(result, dict) for result in results
+    )
+
+
+def create_cached_search_tool(
+    search_fn: Optional[SearchFunction],
+    cache: WebSearchCache,
+    name: str,
+    description: str,
+    offline: bool = False,
+) -> BaseTool:
+    """
+    Wrap a web search function with `cache`. In offline mode, or without a
+    search function, results are only ever served from the cache.
+    """
+
+    async def asearch(query: str):
+        if offline or search_fn is None:
+            cached = cache.get(query, allow_expired=True)
+            if cached is None:
+                return "No cached web results for this query, web search is offline."
+            return cached
+
+        cached = cache.get(query)
+        if cached is not None:
+            return cached
+        results = await search_fn(query)
+        # Tavily returns errors (timeouts, quota) as a string instead of
+        # raising, only structured results are worth keeping for the TTL.
+        if is_search_results(results):
+            cache.put(query, results)
+        return results
+
+    return StructuredTool.from_function(
+        coroutine=asearch,
+        name=name,
+        description=description,
+        args_schema=WebSearchInput,
+    )
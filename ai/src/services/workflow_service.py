@@ -1,70 +1,87 @@
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnableConfig
-from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import AIMessage
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    trim_messages,
+)
+from langchain_core.messages.utils import count_tokens_approximately
 import functools
-from typing import Literal
-from langchain.chat_models import init_chat_model
+from typing import Callable, Literal, Optional
+from langchain_core.language_models import BaseChatModel
 
+from factories.agent_factory import AgentFactory
 from managers.prompt_manager import PromptManager
 from services.agent_state import AgentState
+from services.intent_classifier import IntentClassifier, normalize_intent
+from services.review_policy import ReviewPolicy
+from services.tool_executor import ToolExecutor
+
+
+SPECULATIVE_TAG = "speculative_review"
 
 
 class WorkflowService:
-    def __init__(self, tools, config):
+    def __init__(
+        self,
+        tools,
+        config,
+        review_policy: Optional[ReviewPolicy] = None,
+        chat_model_factory: Optional[Callable[..., BaseChatModel]] = None,
+    ):
         self.tools = tools
         self.config = config
+        self.review_policy = review_policy or ReviewPolicy(config)
         self.prompt_manager = PromptManager()
+        self.agent_factory = AgentFactory(
+            tools, config, self.prompt_manager, chat_model_factory
+        )
+        self.router_config = config.get_value("router")
+        self.memory_config = config.get_value("memory")
+        tools_config = config.get_value("tools")
+        self.tool_executor = ToolExecutor(
+            tools,
+            max_concurrency=tools_config["max_concurrency"],
+            timeout_seconds=tools_config["timeout_seconds"],
+        )
+        self.intent_classifier = IntentClassifier(
+            min_similarity=self.router_config["min_similarity"]
+        )
         self.workflow = StateGraph(AgentState)
 
-    def _create_agent_node(self, state, agent, name):
-        result = agent.invoke(state)
-
-        if isinstance(result, AIMessage):
-            result.name = name
-            return {"messages": [result]}
-
-        return {
-            "messages": [
-                AIMessage(
-                    content=result.content, tool_calls=result.tool_calls, name=name
-                )
-            ]
-        }
-
     def _create_agent(self, config: RunnableConfig, agent_type: str, uses_tools=False):
         node_config = config.get("configurable", {})
 
-        provider = node_config.get("provider")
-        model = node_config.get("model")
-        temperature = node_config.get("temperature")
-
-        key = None
-        if provider == "openai":
-            key = self.config.openai_key
-        elif provider == "google_genai":
-            key = self.config.google_genai_key
-
-        llm = init_chat_model(
-            model_provider=provider, model=model, temperature=temperature, api_key=key
+        return self.agent_factory.get_agent(
+            provider=node_config.get("provider"),
+            model=node_config.get("model"),
+            temperature=node_config.get("temperature"),
+            agent_type=agent_type,
+            uses_tools=uses_tools,
         )
-        system_message = self.prompt_manager.get_template(agent_type)
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", "{system_message}"),
-                MessagesPlaceholder(variable_name="messages"),
-            ]
-        ).partial(system_message=system_message)
-
-        if uses_tools:
-            agent = prompt | llm.bind_tools(self.tools)
-        else:
-            agent = prompt | llm
 
-        return agent
-
-    def _create_node(
+    def _trim_history(self, messages: list) -> list:
+        trimmed = trim_messages(
+            messages,
+            max_tokens=self.memory_config["max_history_tokens"],
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            start_on="human",
+            allow_partial=False,
+        )
+        if trimmed:
+            return trimmed
+        # The current turn alone is over budget, keep it whole rather than
+        # sending tool results without the question that produced them.
+        human_positions = [
+            position
+            for position, message in enumerate(messages)
+            if isinstance(message, HumanMessage)
+        ]
+        return messages[human_positions[-1] if human_positions else 0 :]
+
+    async def _create_node(
         self,
         state: AgentState,
         config: RunnableConfig,
@@ -74,7 +91,9 @@ class WorkflowService:
 
         agent = self._create_agent(config, agent_type, uses_tools)
 
-        result = agent.invoke(state)
+        result = await agent.ainvoke(
+            {**state, "messages": self._trim_history(state["messages"])}, config
+        )
 
         if isinstance(result, AIMessage):
             result.name = f"{agent_type}_agent"
@@ -90,15 +109,61 @@ class WorkflowService:
             ]
         }
 
-    def _create_router_node(
+    async def _create_router_node(
         self, state: AgentState, config: RunnableConfig
     ) -> AgentState:
 
+        # Compact the checkpointed thread once per turn, so its history
+        # stays within the token budget instead of growing without limit.
+        kept = self._trim_history(state["messages"])
+        kept_ids = {message.id for message in kept}
+        removed = [
+            RemoveMessage(id=message.id)
+            for message in state["messages"]
+            if message.id not in kept_ids
+        ]
+
+        question = state["messages"][-1].content
+        intent, confidence = self.intent_classifier.classify(question)
+        if confidence >= self.router_config["confidence_threshold"]:
+            return {"intent": intent, "messages": removed, "tool_cache": {}}
+
         agent = self._create_agent(config, "router")
-        result = agent.invoke(state)
+        result = await agent.ainvoke({**state, "messages": kept}, config)
 
         result.name = "router_agent"
-        return {"intent": result.content}
+        return {
+            "intent": normalize_intent(result.content),
+            "messages": removed,
+            "tool_cache": {},
+        }
+
+    async def _create_review_node(
+        self, state: AgentState, config: RunnableConfig
+    ) -> AgentState:
+
+        intent = normalize_intent(state.get("intent"))
+        draft = state["messages"][-1].content
+        agent = self._create_agent(config, "review")
+
+        if self.review_policy.policy_for(intent) == "speculative":
+            # The draft is already on its way to the client, tag the review
+            # so its tokens are held back and only a correction is sent.
+            config = {**config, "tags": [*config.get("tags", []), SPECULATIVE_TAG]}
+
+        result = await agent.ainvoke(
+            {**state, "messages": self._trim_history(state["messages"])}, config
+        )
+
+        if not self.review_policy.changes(draft, result.content):
+            self.review_policy.record(intent, "unchanged")
+            return {"review_changed": False}
+
+        self.review_policy.record(intent, "changed")
+        return {
+            "messages": [AIMessage(content=result.content, name="review_agent")],
+            "review_changed": True,
+        }
 
     def _setup_nodes(self):
         nodes = {
@@ -123,11 +188,10 @@ class WorkflowService:
                 agent_type="combat",
             ),
             "review": functools.partial(
-                self._create_node,
-                agent_type="review",
+                self._create_review_node,
             ),
-            "tools": ToolNode(self.tools),
-            "review_tools": ToolNode(self.tools),
+            "tools": self.tool_executor,
+            "review_tools": self.tool_executor,
         }
 
         for name, node in nodes.items():
@@ -179,27 +243,29 @@ class WorkflowService:
 
         self.workflow.add_edge("review_tools", "review")
 
-    def _should_search(self, state) -> Literal["tools", "review"]:
+    def _should_search(self, state) -> Literal["tools", "review", "__end__"]:
         messages = state["messages"]
         last_message = messages[-1]
         # If the LLM makes a tool call, then we route to the "tools" node
         if last_message.tool_calls:
             return "tools"
-        # Otherwise, we stop (reply to the user)
+        intent = normalize_intent(state.get("intent"))
+        if not self.review_policy.should_review(intent, last_message.content):
+            self.review_policy.record(intent, "skipped")
+            return END
         return "review"
 
     def _route_from_router(
         self, state
     ) -> Literal["general", "advisor", "creator", "bestiary", "combat"]:
-        intent = state.get("intent", "general")
-        return intent
+        return normalize_intent(state.get("intent"))
 
-    def _review_should_search(self, state) -> Literal["tools", "__end__"]:
+    def _review_should_search(self, state) -> Literal["review_tools", "__end__"]:
         messages = state["messages"]
         last_message = messages[-1]
-        # If the LLM makes a tool call, then we route to the "tools" node
+        # If the LLM makes a tool call, then we route to the "review_tools" node
         if last_message.tool_calls:
-            return "tools"
+            return "review_tools"
         return END
 
     def build(self):
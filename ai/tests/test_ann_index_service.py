@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from services.ann_index_service import AnnIndexService
+
+ANN_CONFIG = {
+    "enabled": True,
+    "method": "hnsw",
+    "m": 16,
+    "ef_construction": 64,
+    "lists": 100,
+    "ef_search": 77,
+    "probes": 10,
+    "prewarm": False,
+}
+
+
+class RecordingConnection:
+    """DBAPI connection recording whether each statement ran in autocommit."""
+
+    def __init__(self):
+        self.autocommit = False
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement):
+        self.executed.append((statement, self.autocommit))
+
+    def close(self):
+        pass
+
+
+def test_search_setting_is_set_outside_a_transaction():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    service = AnnIndexService(engine, ANN_CONFIG, embedding_length=768)
+    connection = RecordingConnection()
+
+    service._configure_session(connection, None)
+
+    assert connection.executed == [("SET hnsw.ef_search = 77", True)]
+    assert connection.autocommit is False
+
+
+@pytest.mark.skipif(
+    not os.getenv("POSTGRES_TEG"), reason="needs a Postgres database in POSTGRES_TEG"
+)
+def test_search_setting_survives_the_pool_reset():
+    async def main():
+        engine = create_async_engine(os.environ["POSTGRES_TEG"], pool_size=1)
+        service = AnnIndexService(engine, ANN_CONFIG, embedding_length=768)
+        try:
+            # The first checkout runs the connect event, the second one reads
+            # the setting back after the pool rolled the connection back.
+            assert await service.acheck_session()
+            assert await service.acheck_session()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_startup_does_not_rewrite_an_untyped_column(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    service = AnnIndexService(engine, ANN_CONFIG, embedding_length=768)
+    executed = []
+
+    async def column_type():
+        return "vector"
+
+    async def execute_autocommit(statement):
+        executed.append(statement)
+
+    monkeypatch.setattr(service, "_column_type", column_type)
+    monkeypatch.setattr(service, "_execute_autocommit", execute_autocommit)
+
+    asyncio.run(service.acreate())
+
+    assert executed == []
+
+
+def test_fixing_refuses_a_different_dimension(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    service = AnnIndexService(engine, ANN_CONFIG, embedding_length=768)
+
+    async def column_type():
+        return "vector(1536)"
+
+    monkeypatch.setattr(service, "_column_type", column_type)
+
+    with pytest.raises(ValueError, match="vector\\(768\\)"):
+        asyncio.run(service.afix_dimensions())
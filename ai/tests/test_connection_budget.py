@@ -0,0 +1,51 @@
+import pytest
+
+from managers.config_manager import Config
+from services.connection_budget import ConnectionBudget
+
+
+class ServerConfig(Config):
+    def __init__(self, **server):
+        super().__init__()
+        self.yaml_config = {
+            **self.yaml_config,
+            "server": {**self.yaml_config["server"], **server},
+        }
+
+
+def test_auto_workers_are_capped_by_the_budget(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 64)
+    config = ServerConfig(workers="auto", db_max_connections=30)
+
+    workers = ConnectionBudget.workers_from_config(config)
+    monkeypatch.setenv("WEB_CONCURRENCY", str(workers))
+    budget = ConnectionBudget.from_config(config)
+
+    assert workers == 6
+    # Two concurrent hybrid queries, each holding two engine connections.
+    assert budget.engine_pool_size + budget.engine_max_overflow >= 4
+    assert budget.workers * budget.per_worker <= 30
+
+
+def test_too_many_workers_fail_before_forking(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "16")
+
+    with pytest.raises(ValueError, match="at most 6 workers"):
+        ConnectionBudget.workers_from_config(ServerConfig(db_max_connections=30))
+
+
+def test_the_mmap_backend_runs_a_single_worker(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 64)
+    config = ServerConfig(workers="auto")
+    config.yaml_config["vector_store"] = {
+        **config.yaml_config["vector_store"],
+        "backend": "mmap",
+    }
+
+    assert ConnectionBudget.workers_from_config(config) == 1
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(ValueError, match="mmap vector store runs a single worker"):
+        ConnectionBudget.workers_from_config(config)
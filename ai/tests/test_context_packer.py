@@ -0,0 +1,106 @@
+import asyncio
+
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from services.context_packer import ContextPackingRetriever, _overlap, count_tokens
+
+
+class StaticRetriever(BaseRetriever):
+    docs: list[Document]
+
+    def _get_relevant_documents(self, query, *, run_manager) -> list[Document]:
+        return self.docs
+
+
+class StoredEmbeddings(Embeddings):
+    """Vectors of some texts stored at indexing, counting what is embedded."""
+
+    def __init__(self, stored: dict[str, list[float]]):
+        self._stored = stored
+        self.embedded: list[str] = []
+
+    def stored(self, texts):
+        return [self._stored.get(text) for text in texts]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[0.0, 1.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_overlap_is_searched_within_the_window():
+    shared = "the creature is restrained"
+
+    assert _overlap("a" * 50 + shared, shared + "b" * 50, 20, 150) == len(shared)
+    assert _overlap("a" * 50 + shared, shared + "b" * 50, 20, 20) == 0
+    assert _overlap("abcdef", "ghijkl", 1, 150) == 0
+
+
+def test_only_chunks_without_a_stored_vector_are_embedded():
+    docs = [
+        Document(page_content="Fireball deals fire damage.", metadata={"page": 1}),
+        Document(page_content="Goblins are small.", metadata={"page": 2}),
+        Document(page_content="Owlbears hug.", metadata={"page": 3}),
+    ]
+    embeddings = StoredEmbeddings(
+        {docs[0].page_content: [1.0, 0.0], docs[1].page_content: [0.6, 0.8]}
+    )
+    packer = ContextPackingRetriever(
+        retriever=StaticRetriever(docs=docs), embeddings=embeddings
+    )
+
+    packed = asyncio.run(packer.ainvoke("fire"))
+
+    assert embeddings.embedded == ["Owlbears hug."]
+    assert packed[0].page_content == "Fireball deals fire damage."
+    assert len(packed) == 3
+
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    shared = " and the creature is restrained until the end of its turn."
+    docs = [
+        Document(page_content="The net hits" + shared, metadata={"page": 7}),
+        Document(page_content=shared.strip() + " It can escape.", metadata={"page": 7}),
+    ]
+    embeddings = StoredEmbeddings(
+        {docs[0].page_content: [1.0, 0.0], docs[1].page_content: [0.0, 1.0]}
+    )
+    packer = ContextPackingRetriever(
+        retriever=StaticRetriever(docs=docs), embeddings=embeddings
+    )
+
+    packed = packer.invoke("net")
+
+    assert [doc.page_content for doc in packed] == [
+        "The net hits" + shared + " It can escape."
+    ]
+    assert embeddings.embedded == []
+
+
+def test_packed_chunks_fit_the_token_budget():
+    docs = [
+        Document(page_content="a" * 400, metadata={"page": 1}),
+        Document(page_content="b" * 200, metadata={"page": 2}),
+        Document(page_content="c" * 100, metadata={"page": 3}),
+    ]
+    embeddings = StoredEmbeddings(
+        {
+            docs[0].page_content: [1.0, 0.0],
+            docs[1].page_content: [0.8, 0.6],
+            docs[2].page_content: [0.0, 1.0],
+        }
+    )
+
+    packed = ContextPackingRetriever(
+        retriever=StaticRetriever(docs=docs), embeddings=embeddings, max_tokens=130
+    ).invoke("a")
+    cut = ContextPackingRetriever(
+        retriever=StaticRetriever(docs=docs), embeddings=embeddings, max_tokens=60
+    ).invoke("a")
+
+    assert [count_tokens(doc.page_content) for doc in packed] == [100, 25]
+    assert [count_tokens(doc.page_content) for doc in cut] == [60]
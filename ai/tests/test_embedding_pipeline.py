@@ -0,0 +1,103 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from managers.config_manager import Config
+from services.cached_embeddings import CachedEmbeddings
+from services.embedding_pipeline import EmbeddingPipeline
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class ThrottledEmbeddings(Embeddings):
+    """Fails the given calls with a 429, and every batch with `failing_text`."""
+
+    def __init__(self, rate_limited_calls=(), failing_text=None):
+        self.rate_limited_calls = set(rate_limited_calls)
+        self.failing_text = failing_text
+        self.calls = 0
+        self.embedded: list[str] = []
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0)
+        if call in self.rate_limited_calls:
+            raise RateLimitError("429 RESOURCE_EXHAUSTED")
+        if self.failing_text in texts:
+            raise RuntimeError("upstream unavailable")
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
+
+def pipeline(tmp_path, underlying, **pipeline_config) -> EmbeddingPipeline:
+    config = Config()
+    config.yaml_config = {
+        **config.yaml_config,
+        "embedding_pipeline": {
+            "batch_size": 2,
+            "max_in_flight": 4,
+            "max_retries": 3,
+            "initial_backoff_seconds": 0.0,
+            "max_backoff_seconds": 0.0,
+            **pipeline_config,
+        },
+    }
+    embeddings = CachedEmbeddings(
+        underlying, model_name="test", path=str(tmp_path / "embeddings.sqlite")
+    )
+    return EmbeddingPipeline(config, embeddings)
+
+
+TEXTS = [f"Spell {position}" for position in range(12)]
+
+
+def test_rate_limits_halve_the_concurrency_until_batches_succeed(tmp_path):
+    underlying = ThrottledEmbeddings(rate_limited_calls={1, 2})
+    limits: list[int] = []
+
+    progress = asyncio.run(
+        pipeline(tmp_path, underlying).aembed(
+            TEXTS, on_progress=lambda progress: limits.append(progress.in_flight_limit)
+        )
+    )
+
+    assert progress.rate_limited == 2
+    assert progress.batches_done == progress.batches_total == 6
+    assert limits[0] == 4
+    assert min(limits) < 4
+    assert limits[-1] == 4
+    # Both throttled batches were retried, nothing was embedded twice.
+    assert underlying.calls == 8
+    assert Counter(underlying.embedded) == Counter(TEXTS)
+
+
+def test_a_rerun_only_embeds_batches_that_did_not_complete(tmp_path):
+    underlying = ThrottledEmbeddings(failing_text="Spell 7")
+    embedding_pipeline = pipeline(tmp_path, underlying, max_retries=1)
+
+    with pytest.raises(RuntimeError, match="upstream unavailable"):
+        asyncio.run(embedding_pipeline.aembed(TEXTS))
+    completed = list(underlying.embedded)
+    underlying.failing_text = None
+    progress = asyncio.run(embedding_pipeline.aembed(TEXTS))
+
+    assert completed
+    assert progress.texts_cached == len(completed)
+    assert Counter(underlying.embedded) == Counter(TEXTS)
+
+    calls = underlying.calls
+    progress = asyncio.run(embedding_pipeline.aembed(TEXTS))
+
+    assert progress.batches_total == 0
+    assert underlying.calls == calls
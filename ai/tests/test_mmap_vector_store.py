@@ -0,0 +1,54 @@
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from services.mmap_vector_store import MmapVectorStore
+
+
+class LetterEmbeddings(Embeddings):
+    """Counts of a few letters, enough to tell short texts apart."""
+
+    def _embed(self, text: str) -> list[float]:
+        return [text.count(letter) + 0.1 for letter in "aeiou"]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def test_reload_sees_adds_overwrites_and_deletes(tmp_path):
+    store = MmapVectorStore(LetterEmbeddings(), str(tmp_path), initial_capacity=2)
+    store.add_texts(
+        ["aaa", "eee", "iii"], [{"n": 1}, {"n": 2}, {"n": 3}], ids=["a", "e", "i"]
+    )
+    store.add_texts(["ooo"], [{"n": 4}], ids=["e"])
+    store.delete(["a"])
+    store.add_texts(["uuu"], ids=["u"])
+
+    reloaded = MmapVectorStore(LetterEmbeddings(), str(tmp_path))
+
+    documents = reloaded.get_by_ids(["a", "e", "i", "u"])
+    assert {doc.id: doc.page_content for doc in documents} == {
+        "e": "ooo",
+        "i": "iii",
+        "u": "uuu",
+    }
+    assert reloaded.similarity_search("ooo", k=1)[0].id == "e"
+
+
+def test_batches_append_to_the_log(tmp_path):
+    store = MmapVectorStore(LetterEmbeddings(), str(tmp_path))
+    metadata_path = store._metadata_path
+    written = 0
+    for batch in range(50):
+        before = os.path.getsize(metadata_path) if os.path.exists(metadata_path) else 0
+        store.add_texts([f"text {batch}"], ids=[str(batch)])
+        written += max(0, os.path.getsize(metadata_path) - before)
+
+    # One row and one shape record per batch, never the whole store again.
+    assert written < 50 * 200
+    reloaded = MmapVectorStore(LetterEmbeddings(), str(tmp_path))
+    assert len(reloaded.get_by_ids([str(batch) for batch in range(50)])) == 50
+
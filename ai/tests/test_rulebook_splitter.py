@@ -0,0 +1,71 @@
+from langchain_core.documents.base import Document
+
+from services.context_packer import count_tokens
+from services.rulebook_splitter import RulebookTextSplitter
+
+MAX_CHUNK_SIZE = 128
+
+
+def rulebook_pages() -> list[Document]:
+    prose = " ".join(
+        f"Rule {position} applies when a creature moves through difficult terrain."
+        for position in range(200)
+    )
+    table = "\n".join(
+        ["d100  Trinket"]
+        + [
+            f"{position}  A small token shaped like creature {position}"
+            for position in range(300)
+        ]
+    )
+    paragraphs = "\n".join(
+        f"The wizard studies spell {position} and prepares it after a long rest."
+        for position in range(150)
+    )
+    word = "Aaaa" * 2000
+    sections = ["Movement", prose, "Trinkets", table, "Spellcasting", paragraphs]
+    text = "\n".join(sections + ["Glossary", word])
+    return [Document(page_content=text, metadata={"source": "phb.pdf", "page": 1})]
+
+
+def test_tokens_are_approximated_from_characters():
+    assert count_tokens("") == 0
+    assert count_tokens("Goblin") == 2
+    assert count_tokens("a" * 4096) == 1024
+
+
+def test_no_chunk_is_above_max_chunk_size():
+    splitter = RulebookTextSplitter(chunk_size=64, max_chunk_size=MAX_CHUNK_SIZE)
+
+    chunks = splitter.split_documents(rulebook_pages())
+
+    assert chunks
+    sizes = [count_tokens(chunk.page_content) for chunk in chunks]
+    assert max(sizes) <= MAX_CHUNK_SIZE
+    # Sizes are in tokens, packed chunks are well above chunk_size characters.
+    assert max(len(chunk.page_content) for chunk in chunks) > MAX_CHUNK_SIZE
+    assert sorted(sizes)[len(sizes) // 2] > 32
+
+
+def test_split_tables_repeat_their_header():
+    splitter = RulebookTextSplitter(chunk_size=64, max_chunk_size=MAX_CHUNK_SIZE)
+
+    chunks = splitter.split_documents(rulebook_pages())
+    table_chunks = [
+        chunk for chunk in chunks if "A small token shaped like" in chunk.page_content
+    ]
+
+    assert len(table_chunks) > 1
+    assert all("d100  Trinket" in chunk.page_content for chunk in table_chunks)
+
+
+def test_split_parts_keep_the_section_title():
+    splitter = RulebookTextSplitter(chunk_size=64, max_chunk_size=MAX_CHUNK_SIZE)
+
+    chunks = splitter.split_documents(rulebook_pages())
+    movement = [
+        chunk for chunk in chunks if chunk.metadata.get("section") == "Movement"
+    ]
+
+    assert len(movement) > 1
+    assert all(chunk.page_content.startswith("Movement\n") for chunk in movement)
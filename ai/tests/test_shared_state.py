@@ -0,0 +1,42 @@
+import numpy as np
+
+from managers.config_manager import Config
+from models.ingestion_job import IngestionJob
+from services.answer_cache_service import AnswerCacheService
+from services.shared_state import SharedState
+
+
+def test_workers_see_each_others_jobs_and_index_version(tmp_path):
+    path = str(tmp_path / "shared_state.sqlite")
+    worker, other_worker = SharedState(path), SharedState(path)
+
+    worker.save_job(IngestionJob(id="job", filename="phb.pdf", status="running"))
+    version = worker.bump_index_version()
+
+    assert other_worker.load_job("job").status == "running"
+    assert other_worker.index_version() == version == 1
+
+
+def test_answer_cache_drops_entries_after_another_workers_ingest(tmp_path):
+    config = Config()
+    config.yaml_config = {
+        **config.yaml_config,
+        "answer_cache": {
+            **config.yaml_config["answer_cache"],
+            "path": str(tmp_path / "answers.sqlite"),
+        },
+    }
+    state = SharedState(str(tmp_path / "shared_state.sqlite"))
+    worker, ingesting_worker = (
+        AnswerCacheService(config, embeddings=None, index_version=state.index_version)
+        for _ in range(2)
+    )
+    vector = np.ones(4, dtype=np.float32) / 2
+    worker.store(vector, "scope", "What is a cantrip?", "A level 0 spell.")
+    assert worker.lookup(vector, "scope") == "A level 0 spell."
+
+    # What VectorStoreService does after indexing on the other worker.
+    state.bump_index_version()
+    ingesting_worker.invalidate()
+
+    assert worker.lookup(vector, "scope") is None
@@ -0,0 +1,69 @@
+import asyncio
+
+from managers.config_manager import Config
+from services.index_manifest import IndexManifest
+from services.pdf_parser import ParallelPdfParser
+from services.startup_indexer import StartupIndexer
+
+
+class FlakyVectorStoreService:
+    """Indexes PDFs, failing `broken` always and `flaky` on its first attempt."""
+
+    pdf_parser = ParallelPdfParser
+
+    def __init__(self, broken: str, flaky: str):
+        self.broken = broken
+        self.flaky = flaky
+        self.attempts: dict[str, int] = {}
+
+    async def aadd_to_vector_store(self, path: str):
+        self.attempts[path] = self.attempts.get(path, 0) + 1
+        if path.endswith(self.broken) or (
+            path.endswith(self.flaky) and self.attempts[path] == 1
+        ):
+            raise ValueError(f"Cannot parse {path}")
+
+    async def adelete_source(self, source: str):
+        pass
+
+
+def indexer(tmp_path, vector_store_service) -> StartupIndexer:
+    config = Config()
+    config.yaml_config = {
+        **config.yaml_config,
+        "documents_path": str(tmp_path / "documents"),
+        "startup_indexing": {
+            "enabled": True,
+            "manifest_path": str(tmp_path / "index" / "manifest.json"),
+            "max_attempts": 2,
+            "retry_delay_seconds": 0.0,
+        },
+    }
+    return StartupIndexer(config, vector_store_service)
+
+
+def test_failing_files_are_skipped_and_reported(tmp_path):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    for name in ("broken.pdf", "flaky.pdf", "phb.pdf"):
+        (documents / name).write_bytes(b"%PDF-1.4 " + name.encode())
+    service = FlakyVectorStoreService(broken="broken.pdf", flaky="flaky.pdf")
+    startup_indexer = indexer(tmp_path, service)
+
+    async def run():
+        startup_indexer.start()
+        await startup_indexer._task
+        await startup_indexer.aclose()
+
+    asyncio.run(run())
+    status = startup_indexer.status
+    manifest = IndexManifest(startup_indexer.manifest_path)
+
+    assert status.status == "ready"
+    assert status.files_indexed == 2
+    assert list(status.files_failed) == ["broken.pdf"]
+    assert "Cannot parse" in status.files_failed["broken.pdf"]
+    assert service.attempts[str(documents / "broken.pdf")] == 2
+    # The skipped file is retried on the next start.
+    assert manifest.is_changed(str(documents / "broken.pdf"))
+    assert not manifest.is_changed(str(documents / "flaky.pdf"))
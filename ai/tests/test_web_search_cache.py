@@ -0,0 +1,35 @@
+import asyncio
+
+from services.web_search_cache import WebSearchCache, create_cached_search_tool
+
+
+def test_failed_search_is_not_cached(tmp_path):
+    calls = []
+
+    async def flaky_search(query: str):
+        # Like TavilySearchResults, report the error as the result.
+        calls.append(query)
+        if len(calls) == 1:
+            return "HTTPError('429 Client Error: Too Many Requests')"
+        return [{"url": "https://example.com", "content": f"About {query}"}]
+
+    cache = WebSearchCache(
+        path=str(tmp_path / "web_search.sqlite"), ttl_seconds=3600, max_entries=10
+    )
+    tool = create_cached_search_tool(
+        flaky_search, cache, name="search", description="Search the web."
+    )
+
+    async def main():
+        first = await tool.ainvoke({"query": "dragon lairs"})
+        second = await tool.ainvoke({"query": "dragon lairs"})
+        third = await tool.ainvoke({"query": "dragon lairs"})
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+
+    assert isinstance(first, str)
+    assert second == third == [
+        {"url": "https://example.com", "content": "About dragon lairs"}
+    ]
+    assert len(calls) == 2
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+from managers.config_manager import Config
+from services.graph_service import build_graph
+from services.review_policy import ReviewPolicy
+
+
+class Calls:
+    active = 0
+    max_active = 0
+
+
+class SlowChatModel(BaseChatModel):
+    """Answers after `latency` seconds and records how many calls overlap."""
+
+    latency: float = 0.2
+    # Shared by every model the factory creates, a dict field would be copied.
+    calls: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-test"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("The graph only calls chat models async")
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.calls.active += 1
+        self.calls.max_active = max(self.calls.max_active, self.calls.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.calls.active -= 1
+        message = AIMessage(content="general")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class EmptyRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager) -> list[Document]:
+        return []
+
+
+def test_concurrent_requests_do_not_block_each_other():
+    calls = Calls()
+
+    graph = build_graph(
+        EmptyRetriever(),
+        review_policy=ReviewPolicy(Config()),
+        chat_model_factory=lambda **kwargs: SlowChatModel(calls=calls),
+    )
+    config = {"configurable": {"provider": "fake", "model": "slow", "temperature": 0}}
+
+    async def ask(question: str):
+        state = {"messages": [HumanMessage(content=question)]}
+        return await graph.ainvoke(state, config)
+
+    async def main():
+        await asyncio.gather(
+            ask("How does grappling work?"), ask("What is a saving throw?")
+        )
+
+    asyncio.run(main())
+
+    assert calls.max_active == 2
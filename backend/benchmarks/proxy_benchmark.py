@@ -0,0 +1,238 @@
+"""
+Measures what the backend `/chat` proxy adds on top of the AI service.
+
+A local stand-in for the AI service streams timestamped SSE events. The
+same stream is read once directly and once through the proxy, and the
+script reports:
+
+- the latency the proxy adds per chunk;
+- whether events and SSE headers arrive unchanged;
+- how long the stand-in keeps streaming after a client disconnects;
+- whether an upstream failing in the middle of an event reaches the client
+  as a separate error event.
+
+The run fails unless events and headers are unchanged, the upstream is
+closed soon after a disconnect and the failure is reported cleanly. Run it
+from the `backend` directory:
+
+    python benchmarks/proxy_benchmark.py --chunks 200 --interval-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import app as proxy  # noqa: E402
+
+QUERY = {
+    "question": "What does the grapple action let me do?",
+    "provider": "fake",
+    "model": "fake",
+    "temperature": 0.0,
+}
+
+
+def create_upstream(chunks: int, interval: float, upstream_state: dict) -> FastAPI:
+    upstream = FastAPI()
+
+    @upstream.post("/chat")
+    async def chat():
+        async def events():
+            upstream_state["closed_at"] = None
+            try:
+                for position in range(chunks):
+                    if position == upstream_state.get("fail_at"):
+                        # Cut the connection halfway through an event.
+                        yield 'data: {"type": "tok'
+                        raise RuntimeError("upstream failed")
+                    await asyncio.sleep(interval)
+                    payload = json.dumps(
+                        {
+                            "type": "token",
+                            "node": "general",
+                            "content": f"token{position} ",
+                            "sent": time.perf_counter(),
+                        }
+                    )
+                    yield f"data: {payload}\n\n"
+                yield 'data: {"type": "done"}\n\n'
+            finally:
+                upstream_state["closed_at"] = time.perf_counter()
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Thread-Id": "benchmark"},
+        )
+
+    return upstream
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def serve(app, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def read_body(client: httpx.AsyncClient, url: str) -> bytes:
+    async with client.stream("POST", url, json=QUERY) as response:
+        return b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+async def read_stream(client: httpx.AsyncClient, url: str, stop_after=None) -> dict:
+    latencies = []
+    body = b""
+    buffer = b""
+    async with client.stream("POST", url, json=QUERY) as response:
+        headers = dict(response.headers)
+        async for chunk in response.aiter_raw():
+            received = time.perf_counter()
+            body += chunk
+            buffer += chunk
+            while b"\n\n" in buffer:
+                event, buffer = buffer.split(b"\n\n", 1)
+                data = json.loads(event.decode().removeprefix("data: "))
+                if "sent" in data:
+                    latencies.append(received - data["sent"])
+            if stop_after is not None and len(latencies) >= stop_after:
+                break
+    return {"latencies": latencies, "body": body, "headers": headers}
+
+
+def events(body: bytes) -> list[dict]:
+    """Decoded events without their send timestamps, which differ per run."""
+    decoded = []
+    for event in body.decode().split("\n\n"):
+        if event:
+            data = json.loads(event.removeprefix("data: "))
+            data.pop("sent", None)
+            decoded.append(data)
+    return decoded
+
+
+def event_types(body: bytes) -> list:
+    """Event types as an SSE client parses them, None for a broken event."""
+    types = []
+    for event in body.decode().split("\n\n"):
+        if not event:
+            continue
+        try:
+            types.append(json.loads(event.removeprefix("data: "))["type"])
+        except (json.JSONDecodeError, KeyError):
+            types.append(None)
+    return types
+
+
+def summary(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    upstream_state = {}
+    upstream_port, proxy_port = free_port(), free_port()
+    proxy.config.config["ai_service_link"] = f"http://127.0.0.1:{upstream_port}"
+
+    upstream_server, upstream_task = await serve(
+        create_upstream(args.chunks, args.interval_ms / 1000, upstream_state),
+        upstream_port,
+    )
+    proxy_server, proxy_task = await serve(proxy.app, proxy_port)
+
+    try:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            direct = await read_stream(client, f"http://127.0.0.1:{upstream_port}/chat")
+            proxied = await read_stream(client, f"http://127.0.0.1:{proxy_port}/chat")
+
+            await read_stream(
+                client, f"http://127.0.0.1:{proxy_port}/chat", stop_after=5
+            )
+            disconnected = time.perf_counter()
+            for _ in range(200):
+                if upstream_state.get("closed_at"):
+                    break
+                await asyncio.sleep(0.01)
+            closed_at = upstream_state.get("closed_at")
+
+            upstream_state["fail_at"] = min(5, args.chunks - 1)
+            failed = await read_body(client, f"http://127.0.0.1:{proxy_port}/chat")
+    finally:
+        proxy_server.should_exit = True
+        upstream_server.should_exit = True
+        await asyncio.gather(proxy_task, upstream_task)
+
+    added = [
+        through_proxy - straight
+        for through_proxy, straight in zip(proxied["latencies"], direct["latencies"])
+    ]
+    return {
+        "parameters": {"chunks": args.chunks, "interval_ms": args.interval_ms},
+        "direct": summary(direct["latencies"]),
+        "proxied": summary(proxied["latencies"]),
+        "added_per_chunk": summary(added),
+        "same_events": events(direct["body"]) == events(proxied["body"]),
+        "headers_kept": {
+            name: proxied["headers"].get(name) == direct["headers"].get(name)
+            for name in ("content-type", "cache-control", "x-thread-id")
+        },
+        "upstream_closed_after_disconnect_ms": (
+            (closed_at - disconnected) * 1000 if closed_at else None
+        ),
+        "failure_events": event_types(failed),
+    }
+
+
+def check(results: dict, max_close_ms: float = 1000.0):
+    assert results["same_events"], "events changed through the proxy"
+    assert all(results["headers_kept"].values()), results["headers_kept"]
+    closed_ms = results["upstream_closed_after_disconnect_ms"]
+    assert closed_ms is not None and closed_ms <= max_close_ms, (
+        f"upstream still streaming {closed_ms} ms after the client disconnected"
+    )
+    assert results["failure_events"][-1] == "error", results["failure_events"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    parser.add_argument("--output", type=str, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    check(results)
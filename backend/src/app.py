@@ -1,7 +1,10 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
+import httpx
 from httpx import AsyncClient
+import json
 import logging
 from models.request import Request
 from managers.config_manager import Config
@@ -32,33 +35,75 @@ def get_http_client() -> AsyncClient:
     return app.state.client
 
 
+# Hop-by-hop headers describe the upstream connection, not the stream.
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "content-length",
+}
+
+
+def proxy_headers(headers: httpx.Headers) -> dict:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+
+async def stream_upstream(response: httpx.Response):
+    """
+    Forward the upstream body as received. Each chunk is only read once the
+    previous one was sent, so a slow client slows down the upstream read
+    instead of buffering here.
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    except httpx.HTTPError as e:
+        logging.error(e)
+        payload = json.dumps({"type": "error", "error": str(e)})
+        # The failure may cut an event short, start a fresh frame so the
+        # client does not merge the error into it.
+        yield f"\n\ndata: {payload}\n\n".encode()
+    finally:
+        await response.aclose()
+
+
 @app.post("/chat")
 async def chit_chat(request: Request):
+    client = get_http_client()
+    upstream_request = client.build_request(
+        "POST",
+        url="/chat",
+        json={
+            "question": request.question,
+            "provider": request.provider,
+            "model": request.model,
+            "temperature": request.temperature,
+            "thread_id": request.thread_id,
+        },
+    )
     try:
-        client = get_http_client()
-        async with client.stream(
-            "POST",
-            url="/generate",
-            json={
-                "question": request.question,
-                "provider": request.provider,
-                "model": request.model,
-                "temperature": request.temperature,
-            },
-        ) as response:
-
-            async def gen():
-                try:
-                    async for chunk in response.aiter_lines():
-                        yield chunk
-                except Exception as e:
-                    logging.error(e)
-                    yield f"\n\n[Error]: {str(e)}\n"
-
-            return StreamingResponse(gen(), media_type="text/plain")
-    except Exception as e:
+        response = await client.send(upstream_request, stream=True)
+    except httpx.HTTPError as e:
         logging.error(e)
-        return "ERROR"
+        raise HTTPException(status_code=502, detail="AI service is unavailable")
+
+    # The background task also closes the upstream response when the client
+    # disconnects before the stream finished.
+    return StreamingResponse(
+        stream_upstream(response),
+        status_code=response.status_code,
+        headers=proxy_headers(response.headers),
+        background=BackgroundTask(response.aclose),
+    )
 
     # logging.info(response)
     # data = response.json()
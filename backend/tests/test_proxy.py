@@ -0,0 +1,16 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+import proxy_benchmark  # noqa: E402
+
+
+def test_chat_proxy_streams_upstream_unchanged():
+    args = argparse.Namespace(chunks=30, interval_ms=2.0, output=None)
+
+    results = asyncio.run(proxy_benchmark.main(args))
+
+    proxy_benchmark.check(results)
@@ -53,6 +53,7 @@ class ChatComponent:
             "model": ai_model["model"],
             "provider": ai_model["provider"],
             "temperature": temperature,
+            "thread_id": SessionStateManager.get_thread_id(),
         }
 
         print(f"Sending request: {request_data}")
@@ -87,6 +88,7 @@ class ChatComponent:
             "model": ai_model["model"],
             "provider": ai_model["provider"],
             "temperature": temperature,
+            "thread_id": SessionStateManager.get_thread_id(),
         }
 
         print(f"Sending streaming request: {request_data}")
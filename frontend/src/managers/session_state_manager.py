@@ -1,3 +1,5 @@
+import uuid
+
 import streamlit as st
 
 class SessionStateManager:
@@ -6,11 +8,15 @@ class SessionStateManager:
 
     def initialize(self):
         self._initialize_messages()
+        self._initialize_thread_id()
 
     def _initialize_messages(self):
         if "messages" not in st.session_state:
             st.session_state.messages = []
 
+    def _initialize_thread_id(self):
+        if "thread_id" not in st.session_state:
+            st.session_state.thread_id = uuid.uuid4().hex
 
     @staticmethod
     def get_messages():
@@ -20,6 +26,10 @@ class SessionStateManager:
     def add_message(role, content):
         st.session_state.messages.append({"role": role, "content": content})
 
+    @staticmethod
+    def get_thread_id():
+        return st.session_state.thread_id
+
     @staticmethod
     def get_ai_model():
         return st.session_state.ai_model
@@ -109,8 +109,21 @@ class FrontendService:
                     break
                 try:
                     chunk_data = json.loads(data)
+                    # Typed events from the AI service, see StreamService
+                    event_type = chunk_data.get("type")
+                    if event_type == "token":
+                        yield chunk_data["content"]
+                    elif event_type == "correction":
+                        # The review changed the answer streamed so far
+                        yield f"\n\n---\n**Correction:**\n\n{chunk_data['content']}"
+                    elif event_type == "error":
+                        yield f"\n\n[Error]: {chunk_data['error']}"
+                    elif event_type == "done":
+                        break
+                    elif event_type is not None:
+                        continue
                     # Extract content based on your LangGraph response format
-                    if "content" in chunk_data:
+                    elif "content" in chunk_data:
                         yield chunk_data["content"]
                     elif "message" in chunk_data:
                         yield chunk_data["message"]